@@ -0,0 +1,41 @@
+"""
+Бенчмарки проекта.
+
+Запускаются из корня репозитория как модули, например:
+python -m benchmarks.profanity
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import time
+
+
+def setup_django():
+    """
+    Настраиваем Django для запуска бенчмарка вне manage.py.
+
+    Кеш страниц и канал сбросов лежат в своём каталоге прогона: так
+    бенчмарк не стирает и не читает страницы сайта и других прогонов.
+    Процессы, запущенные бенчмарком, наследуют каталог через окружение.
+    """
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+    if 'YANEWS_CACHE_DIR' not in os.environ:
+        directory = tempfile.mkdtemp(prefix='yanews-bench-')
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        os.environ['YANEWS_CACHE_DIR'] = directory
+    django.setup()
+
+
+def best_of(func, repeat=5, number=1):
+    """Лучшее время одного вызова func в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
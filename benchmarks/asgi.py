@@ -0,0 +1,247 @@
+"""
+Нагрузочный бенчмарк страниц новостей под WSGI и под ASGI.
+
+Создаёт временный файл базы с настройками из settings и наполняет его
+через news.seeding. Затем для каждого режима запускает отдельный
+процесс: WSGI — синхронные представления и поток на клиента, ASGI —
+асинхронные представления (YANEWS_ASYNC_VIEWS=1), все клиенты в одном
+цикле событий. Половина клиентов анонимны, половина вошли на сайт;
+каждый открывает случайную из --hot новостей. Раз в --invalidate-ms
+кеш страниц этих новостей сбрасывается, как после нового комментария,
+и одновременные промахи по одной новости сходятся в одно чтение.
+Печатает запросы в секунду, задержки и число потоков процесса:
+
+python -m benchmarks.asgi
+python -m benchmarks.asgi --clients 64 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+MODES = ('wsgi', 'asgi')
+
+
+def configure(database):
+    from django.conf import settings
+    from django.test.utils import setup_test_environment
+
+    # До первого соединения: основная база — временный файл.
+    settings.DATABASES['default']['NAME'] = database
+    setup_test_environment()
+
+
+def prepare(database, options):
+    from django.core.management import call_command
+
+    configure(database)
+    call_command('migrate', verbosity=0)
+
+    from django.contrib.auth import get_user_model
+
+    from news.seeding import seed
+
+    seed(options.news, 1, options.comments, random_seed=1)
+    get_user_model().objects.bulk_create(
+        get_user_model()(username=f'Читатель {index}')
+        for index in range(options.clients)
+    )
+
+
+def make_clients(client_class, count):
+    from django.contrib.auth import get_user_model
+
+    users = get_user_model().objects.filter(
+        username__startswith='Читатель'
+    ).order_by('pk')[:count // 2]
+    clients = [client_class() for _ in range(count)]
+    for client, user in zip(clients, users):
+        client.force_login(user)
+    return clients
+
+
+def hot_urls(count):
+    from django.conf import settings
+    from django.urls import reverse
+
+    from news.models import News
+
+    return {
+        pk: reverse(settings.URL['detail'], args=(pk,))
+        for pk in News.objects.order_by('-comment_count').values_list(
+            'pk', flat=True
+        )[:count]
+    }
+
+
+def invalidate(news_ids):
+    from news import cache as page_cache
+
+    page_cache.bump_versions(
+        [page_cache.detail_page_key(pk) for pk in news_ids]
+    )
+
+
+def summary(latencies, errors, seconds):
+    latencies.sort()
+    return {
+        'rate': len(latencies) / seconds,
+        'p50': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000
+        if latencies else 0,
+        'errors': errors,
+        'threads': threading.active_count(),
+    }
+
+
+def run_wsgi(options):
+    from django.db import connections
+    from django.test import Client
+
+    urls = list(hot_urls(options.hot).values())
+    news_ids = list(hot_urls(options.hot))
+    clients = make_clients(Client, options.clients)
+    latencies = []
+    counters = {'errors': 0, 'threads': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + options.seconds
+
+    def worker(client):
+        done, errors = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.get(random.choice(urls))
+            if response.status_code == 200:
+                done.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        connections.close_all()
+        with lock:
+            latencies.extend(done)
+            counters['errors'] += errors
+
+    def invalidator():
+        while time.perf_counter() < deadline:
+            time.sleep(options.invalidate_ms / 1000)
+            invalidate(news_ids)
+
+    threads = [
+        threading.Thread(target=worker, args=(client,)) for client in clients
+    ] + [threading.Thread(target=invalidator)]
+    for thread in threads:
+        thread.start()
+    time.sleep(options.seconds / 2)
+    counters['threads'] = threading.active_count()
+    for thread in threads:
+        thread.join()
+    result = summary(latencies, counters['errors'], options.seconds)
+    result['threads'] = counters['threads']
+    return result
+
+
+def run_asgi(options):
+    from django.test import AsyncClient
+
+    urls = list(hot_urls(options.hot).values())
+    news_ids = list(hot_urls(options.hot))
+    clients = make_clients(AsyncClient, options.clients)
+    latencies = []
+    counters = {'errors': 0, 'threads': 0}
+
+    async def worker(client, deadline):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(random.choice(urls))
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                counters['errors'] += 1
+
+    async def invalidator(deadline):
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(options.invalidate_ms / 1000)
+            invalidate(news_ids)
+
+    async def watcher():
+        await asyncio.sleep(options.seconds / 2)
+        counters['threads'] = threading.active_count()
+
+    async def main():
+        deadline = time.perf_counter() + options.seconds
+        await asyncio.gather(
+            *(worker(client, deadline) for client in clients),
+            invalidator(deadline),
+            watcher(),
+        )
+
+    asyncio.run(main())
+    result = summary(latencies, counters['errors'], options.seconds)
+    result['threads'] = counters['threads']
+    return result
+
+
+def serve(options):
+    """Процесс одного режима: печатает результат в JSON."""
+    if options.serve == 'asgi':
+        os.environ['YANEWS_ASYNC_VIEWS'] = '1'
+    setup_django()
+    configure(options.database)
+    run = run_asgi if options.serve == 'asgi' else run_wsgi
+    print(json.dumps(run(options)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--hot', type=int, default=5)
+    parser.add_argument('--invalidate-ms', type=float, default=100)
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    if options.serve:
+        serve(options)
+        return
+
+    setup_django()
+    with tempfile.TemporaryDirectory() as directory:
+        database = str(Path(directory) / 'bench.db')
+        prepare(database, options)
+        print(
+            f'{"режим":<6} {"запросов/с":>11} {"p50, мс":>8} {"p99, мс":>8} '
+            f'{"ошибок":>7} {"потоков":>8}'
+        )
+        for mode in MODES:
+            output = subprocess.run(
+                [
+                    sys.executable, '-m', 'benchmarks.asgi',
+                    '--serve', mode, '--database', database,
+                    '--clients', str(options.clients),
+                    '--seconds', str(options.seconds),
+                    '--hot', str(options.hot),
+                    '--invalidate-ms', str(options.invalidate_ms),
+                ],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+            print(
+                f'{mode:<6} {result["rate"]:>11.0f} {result["p50"]:>8.1f} '
+                f'{result["p99"]:>8.1f} {result["errors"]:>7} '
+                f'{result["threads"]:>8}'
+            )
+
+
+if __name__ == '__main__':
+    main()
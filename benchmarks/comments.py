@@ -0,0 +1,100 @@
+"""
+Бенчмарк одновременной отправки комментариев к одной новости.
+
+Создаёт временный файл базы с настройками из settings, применяет
+миграции и запускает потоки, каждый из которых от имени своего
+пользователя отправляет комментарии через страницу новости. Сравнивает
+запись в транзакции запроса и отложенную запись пачками
+(COMMENT_WRITE_BEHIND):
+
+python -m benchmarks.comments
+python -m benchmarks.comments --threads 32 --seconds 10
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+def worker(client, url, deadline, counters):
+    from django.db import OperationalError, connections
+
+    done = errors = 0
+    while time.perf_counter() < deadline:
+        try:
+            response = client.post(url, data={'text': 'Текст комментария'})
+            if response.status_code == 302:
+                done += 1
+            else:
+                errors += 1
+        except OperationalError:
+            errors += 1
+    connections.close_all()
+    with counters['lock']:
+        counters['done'] += done
+        counters['errors'] += errors
+
+
+def run(clients, url, seconds):
+    counters = {'lock': threading.Lock(), 'done': 0, 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=worker, args=(client, url, deadline, counters))
+        for client in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counters['done'] / seconds, counters['errors']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+
+    with tempfile.TemporaryDirectory() as directory:
+        # До первого соединения: основная база — временный файл.
+        settings.DATABASES['default']['NAME'] = Path(directory) / 'bench.db'
+        setup_test_environment()
+        call_command('migrate', verbosity=0)
+
+        from django.contrib.auth import get_user_model
+        from django.test import Client
+        from django.urls import reverse
+
+        from news.models import News
+        from news.write_behind import comment_writer
+
+        news = News.objects.create(title='Срочная новость', text='Текст.')
+        url = reverse(settings.URL['detail'], args=(news.pk,))
+        clients = []
+        for index in range(options.threads):
+            client = Client()
+            client.force_login(get_user_model().objects.create(
+                username=f'Читатель {index}'
+            ))
+            clients.append(client)
+
+        print(f'{"режим":<14} {"комментариев/с":>15} {"ошибок":>7}')
+        for write_behind in (False, True):
+            settings.COMMENT_WRITE_BEHIND = write_behind
+            rate, errors = run(clients, url, options.seconds)
+            comment_writer.stop()
+            mode = 'write-behind' if write_behind else 'в запросе'
+            print(f'{mode:<14} {rate:>15.0f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Бенчмарк одновременных читателей и писателей SQLite.
+
+Для каждого профиля создаёт отдельный файл базы, применяет миграции и
+запускает потоки: читатели открывают новость с первой страницей
+комментариев, писатели добавляют комментарий так же, как страница
+новости, — в транзакции с увеличением счётчика. Печатает число операций
+в секунду и ошибок «database is locked»:
+
+python -m benchmarks.concurrency
+python -m benchmarks.concurrency --readers 16 --writers 8 --seconds 10
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+# Профиль «по умолчанию» — встроенный бэкенд без настроек,
+# «настроенный» — DATABASES['default'] из settings.
+PROFILES = ('default', 'tuned')
+
+
+def database_settings(profile, path):
+    from django.conf import settings
+
+    if profile == 'default':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+    return {**settings.DATABASES['default'], 'NAME': path}
+
+
+def add_database(alias, config):
+    from django.core.management import call_command
+    from django.db import connections
+
+    connections.settings[alias] = config
+    connections.ensure_defaults(alias)
+    connections.prepare_test_settings(alias)
+    call_command('migrate', database=alias, verbosity=0)
+
+
+def fill(alias, news_count, comments_count):
+    from django.contrib.auth import get_user_model
+
+    from news.models import Comment, News
+
+    author = get_user_model().objects.db_manager(alias).create(
+        username='Автор'
+    )
+    News.objects.using(alias).bulk_create(
+        News(title=f'Новость {index}', text='Текст.')
+        for index in range(news_count)
+    )
+    news_ids = list(News.objects.using(alias).values_list('id', flat=True))
+    Comment.objects.using(alias).bulk_create(
+        Comment(news_id=random.choice(news_ids), author=author, text='Текст')
+        for _ in range(comments_count)
+    )
+    return news_ids, author.pk
+
+
+def read(alias, news_id):
+    from news.models import Comment, News
+
+    News.objects.using(alias).get(pk=news_id)
+    list(
+        Comment.objects.using(alias).filter(news_id=news_id)
+        .select_related('author')[:50]
+    )
+
+
+def write(alias, news_id, author_id):
+    from django.db import transaction
+    from django.db.models import F
+    from django.utils import timezone
+
+    from news.models import Comment, News
+
+    # Те же запросы, что при отправке комментария: чтение новости,
+    # вставка и обновление счётчика. Сигналы не нужны — они пишут
+    # в основную базу.
+    with transaction.atomic(using=alias):
+        News.objects.using(alias).get(pk=news_id)
+        Comment.objects.using(alias).bulk_create([
+            Comment(news_id=news_id, author_id=author_id, text='Текст')
+        ])
+        News.objects.using(alias).filter(pk=news_id).update(
+            comment_count=F('comment_count') + 1, modified=timezone.now()
+        )
+
+
+def worker(operation, deadline, counters, name):
+    from django.db import OperationalError, connections
+
+    done = errors = 0
+    while time.perf_counter() < deadline:
+        try:
+            operation()
+            done += 1
+        except OperationalError:
+            errors += 1
+    connections.close_all()
+    with counters['lock']:
+        counters[name] += done
+        counters[f'{name}_errors'] += errors
+
+
+def run(profile, options, directory):
+    alias = f'bench_{profile}'
+    add_database(
+        alias, database_settings(profile, str(Path(directory) / alias))
+    )
+    news_ids, author_id = fill(alias, options.news, options.comments)
+    counters = {
+        'lock': threading.Lock(),
+        'reads': 0, 'reads_errors': 0, 'writes': 0, 'writes_errors': 0,
+    }
+    deadline = time.perf_counter() + options.seconds
+    threads = [
+        threading.Thread(target=worker, args=(
+            lambda: read(alias, random.choice(news_ids)),
+            deadline, counters, 'reads',
+        ))
+        for _ in range(options.readers)
+    ] + [
+        threading.Thread(target=worker, args=(
+            lambda: write(alias, random.choice(news_ids), author_id),
+            deadline, counters, 'writes',
+        ))
+        for _ in range(options.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        name: value / options.seconds if name in ('reads', 'writes')
+        else value
+        for name, value in counters.items() if name != 'lock'
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=20000)
+    options = parser.parse_args()
+
+    setup_django()
+    print(f'{"профиль":<10} {"чтений/с":>10} {"записей/с":>10} '
+          f'{"ошибок чтения":>14} {"ошибок записи":>14}')
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in PROFILES:
+            result = run(profile, options, directory)
+            print(
+                f'{profile:<10} {result["reads"]:>10.0f} '
+                f'{result["writes"]:>10.0f} {result["reads_errors"]:>14} '
+                f'{result["writes_errors"]:>14}'
+            )
+
+
+if __name__ == '__main__':
+    main()
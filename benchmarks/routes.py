@@ -0,0 +1,161 @@
+"""
+Бенчмарк всех страниц из settings.URL.
+
+Создаёт отдельную тестовую базу, наполняет её через news.seeding и
+прогоняет каждую страницу через тестовый клиент Django — анонимно и от
+имени автора комментария. Печатает p50/p95/p99 и число SQL-запросов
+на запрос и сравнивает их с сохранённым базовым замером:
+
+python -m benchmarks.routes --save-baseline
+python -m benchmarks.routes
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+BASELINE = Path(__file__).with_name('baseline.json')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def measure(client, url, requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = []
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+        assert response.status_code < 400, (url, response.status_code)
+    return {
+        'p50': percentile(timings, 0.5) * 1000,
+        'p95': percentile(timings, 0.95) * 1000,
+        'p99': percentile(timings, 0.99) * 1000,
+        'queries': max(queries),
+    }
+
+
+def run(options):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+
+    from news.models import Comment, News
+    from news.seeding import seed
+
+    seed(
+        options.news, options.users, options.comments,
+        random_seed=options.seed,
+    )
+    # Фоновая запись просмотров сбрасывает главную в случайный момент
+    # замера, и число запросов менялось бы от прогона к прогону.
+    settings.VIEW_COUNTS_FLUSH_INTERVAL = 24 * 60 * 60
+    hot_news = News.objects.order_by('-comment_count').first()
+    comment = Comment.objects.filter(news=hot_news).order_by('-id').first()
+    author = get_user_model().objects.get(pk=comment.author_id)
+    args = {
+        'detail': (hot_news.pk,),
+        'comments': (hot_news.pk,),
+        'events': (hot_news.pk,),
+        'edit': (comment.pk,),
+        'delete': (comment.pk,),
+    }
+    anonymous = Client()
+    authorized = Client()
+    authorized.force_login(author)
+    results = {}
+    for key, name in settings.URL.items():
+        url = reverse(name, args=args.get(key))
+        clients = (('auth', authorized),)
+        if key not in ('edit', 'delete'):
+            clients = (('anon', anonymous),) + clients
+        for label, client in clients:
+            results[f'{name} {label}'] = measure(
+                client, url, options.requests
+            )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Печатаем таблицу и возвращаем список регрессий."""
+    regressions = []
+    print(f'{"страница":<28} {"p50":>8} {"p95":>8} {"p99":>8} '
+          f'{"SQL":>4} {"база p95":>9}')
+    for name, result in results.items():
+        base = baseline.get(name)
+        print(
+            f'{name:<28} {result["p50"]:>8.2f} {result["p95"]:>8.2f} '
+            f'{result["p99"]:>8.2f} {result["queries"]:>4} '
+            f'{base["p95"] if base else float("nan"):>9.2f}'
+        )
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {result["queries"]} > {base["queries"]}'
+            )
+        if result['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {result["p95"]:.2f} мс > '
+                f'{base["p95"]:.2f} мс + {tolerance:.0%}'
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help='Допустимый рост p95 относительно базового замера.'
+    )
+    parser.add_argument('--save-baseline', action='store_true')
+    options = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        results = run(options)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    baseline = {}
+    if BASELINE.exists():
+        baseline = json.loads(BASELINE.read_text())
+    regressions = compare(results, baseline, options.tolerance)
+    if options.save_baseline:
+        BASELINE.write_text(
+            json.dumps(results, indent=2, ensure_ascii=False) + '\n'
+        )
+        print(f'Базовый замер сохранён в {BASELINE}')
+    elif regressions:
+        print('\n'.join(['', 'Регрессии:'] + regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
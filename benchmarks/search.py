@@ -0,0 +1,71 @@
+"""
+Бенчмарк полнотекстового поиска.
+
+Создаёт отдельную тестовую базу, наполняет её новостями через
+news.seeding и добавляет несколько новостей с редким словом. Сравнивает
+первую страницу поиска по индексу FTS5 с icontains по тексту — для
+редкого и для частого слова:
+
+python -m benchmarks.search
+python -m benchmarks.search --news 100000
+"""
+
+import argparse
+
+from benchmarks import best_of, setup_django
+
+RARE_WORD = 'дирижабль'
+COMMON_WORD = 'робот'
+
+
+def run(options):
+    from django.conf import settings
+
+    from news.models import News
+    from news.search import search
+    from news.seeding import seed
+
+    seed(options.news, 1, 0, random_seed=1)
+    News.objects.bulk_create(
+        News(
+            title=f'Новость {index}', text=f'Над городом пролетел {RARE_WORD}.'
+        )
+        for index in range(options.needles)
+    )
+    per_page = settings.NEWS_COUNT_ON_SEARCH_PAGE
+    print(f'{"запрос":<22} {"FTS5, мс":>10} {"icontains, мс":>14}')
+    for word in (RARE_WORD, COMMON_WORD):
+        fts = best_of(lambda: search(word, per_page), options.repeat)
+        like = best_of(
+            lambda: list(News.objects.filter(text__icontains=word).order_by(
+                '-date', '-id'
+            )[:per_page]),
+            options.repeat,
+        )
+        print(f'{word:<22} {fts * 1000:>10.2f} {like * 1000:>14.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=1_000_000)
+    parser.add_argument('--needles', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        run(options)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
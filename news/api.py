@@ -0,0 +1,153 @@
+"""
+JSON API только для чтения.
+
+Данные берутся через .values() без создания моделей, списки разбиты на
+страницы по курсору, состав полей задаётся параметром fields. Ответы
+несут ETag и Last-Modified по времени изменения новостей, поэтому
+клиент может переспросить и получить 304 без тела.
+"""
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import generic
+
+from .cache import make_etag
+from .models import Comment, News
+from .pagination import KeysetPaginator
+
+NEWS_FIELDS = ('id', 'title', 'text', 'date', 'comment_count', 'modified')
+NEWS_LIST_DEFAULT_FIELDS = ('id', 'title', 'date', 'comment_count')
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+class ApiView(generic.View):
+    """Общая часть: выбор полей и условные ответы."""
+    allowed_fields = ()
+    default_fields = ()
+
+    def get_fields(self):
+        param = self.request.GET.get('fields')
+        if not param:
+            return tuple(self.default_fields or self.allowed_fields)
+        fields = tuple(dict.fromkeys(param.split(',')))
+        unknown = set(fields) - set(self.allowed_fields)
+        if unknown:
+            raise BadRequest(
+                f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+            )
+        return fields
+
+    def conditional(self, etag, last_modified, build):
+        """
+        Отвечаем 304, если клиент прислал актуальный валидатор.
+
+        Иначе собираем тело через build() и добавляем валидаторы.
+        """
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=timestamp
+        ) or JsonResponse(
+            build(), json_dumps_params={'ensure_ascii': False}
+        )
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class NewsListApi(ApiView):
+    """Новости по убыванию даты, страницами по курсору."""
+    allowed_fields = NEWS_FIELDS
+    default_fields = NEWS_LIST_DEFAULT_FIELDS
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        cursor = request.GET.get('cursor')
+        paginator = KeysetPaginator(
+            ('-date', '-id'), settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+        )
+        page = paginator.paginate(
+            News.objects.values(*{*fields, 'id', 'date', 'modified'}),
+            cursor,
+        )
+        rows = page.object_list
+        # Валидатор страницы — состав и время изменения её новостей.
+        etag = make_etag(
+            fields, cursor, [(row['id'], row['modified']) for row in rows]
+        )
+        last_modified = max((row['modified'] for row in rows), default=None)
+        return self.conditional(etag, last_modified, lambda: {
+            'results': [
+                {field: row[field] for field in fields} for row in rows
+            ],
+            'next_cursor': page.next_cursor,
+        })
+
+
+class NewsMixin:
+    """Новость из адреса: сначала читаем только время её изменения."""
+
+    def get_news_modified(self):
+        modified = News.objects.filter(pk=self.kwargs['pk']).values_list(
+            'modified', flat=True
+        ).first()
+        if modified is None:
+            raise Http404
+        return modified
+
+
+class NewsDetailApi(NewsMixin, ApiView):
+    """Одна новость."""
+    allowed_fields = NEWS_FIELDS
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        modified = self.get_news_modified()
+        etag = make_etag(self.kwargs['pk'], modified, fields)
+        return self.conditional(
+            etag,
+            modified,
+            lambda: News.objects.filter(pk=self.kwargs['pk']).values(
+                *fields
+            ).get(),
+        )
+
+
+class CommentListApi(NewsMixin, ApiView):
+    """Комментарии к новости по времени, страницами по курсору."""
+    allowed_fields = tuple(COMMENT_FIELDS)
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        cursor = request.GET.get('cursor')
+        modified = self.get_news_modified()
+        etag = make_etag(self.kwargs['pk'], modified, fields, cursor)
+        return self.conditional(
+            etag, modified, lambda: self.build(fields, cursor)
+        )
+
+    def build(self, fields, cursor):
+        paginator = KeysetPaginator(
+            ('created', 'id'), settings.COMMENTS_COUNT_ON_PAGE
+        )
+        page = paginator.paginate(
+            Comment.objects.filter(news_id=self.kwargs['pk']).values(
+                'id', 'created', *(COMMENT_FIELDS[field] for field in fields)
+            ),
+            cursor,
+        )
+        return {
+            'results': [
+                {field: row[COMMENT_FIELDS[field]] for field in fields}
+                for row in page.object_list
+            ],
+            'next_cursor': page.next_cursor,
+        }
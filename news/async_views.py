@@ -0,0 +1,295 @@
+"""
+Асинхронные представления главной и страницы новости для ASGI.
+
+Под ASGI синхронное представление занимает поток на всё время запроса,
+включая ожидание базы. Здесь запрос анонима без параметров отдаётся из
+памяти процесса прямо в цикле событий. За каналом сбросов и общим
+кешем он идёт в ограниченный пул из ASYNC_DB_WORKERS потоков, как и
+остальная работа с базой и шаблонами; пул же ограничивает число
+соединений с базой. Одновременные запросы одной новости читают её из
+базы один раз: первый запрос читает, остальные ждут его результата
+(single-flight).
+Сами страницы строят те же классы из views, поэтому ETag, кеш страниц и
+шаблоны у обоих путей общие.
+
+Живые комментарии (см. events) Django 3.2 не умеет отдавать потоком
+из асинхронного представления, поэтому их обслуживает отдельное
+ASGI-приложение, которое with_events ставит перед Django. Потоковые
+ответы, например всю ветку комментариев, Django 3.2 перебирает прямо в
+цикле событий; StreamingASGIHandler перебирает их в пуле.
+"""
+
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import Http404, QueryDict
+from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve
+
+from yanews.replicas import read_from_primary
+
+from . import cache as page_cache
+from . import events, views
+from .counters import view_counter
+from .models import News
+
+executor = ThreadPoolExecutor(
+    settings.ASYNC_DB_WORKERS, thread_name_prefix='news-db'
+)
+# Поток занят потоковым ответом до конца отправки, поэтому пул отдельный.
+stream_executor = ThreadPoolExecutor(
+    settings.ASYNC_STREAM_WORKERS, thread_name_prefix='news-stream'
+)
+
+
+class SingleFlight:
+    """Одновременные вызовы с одним ключом получают один результат."""
+
+    def __init__(self):
+        # Future привязан к своему циклу событий.
+        self.calls = weakref.WeakKeyDictionary()
+
+    async def run(self, key, func, *args):
+        calls = self.calls.setdefault(asyncio.get_running_loop(), {})
+        future = calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args))
+            calls[key] = future
+            future.add_done_callback(lambda _: calls.pop(key, None))
+        # Отключившийся клиент не отменяет чтение для остальных.
+        return await asyncio.shield(future)
+
+
+flights = SingleFlight()
+
+
+def call(request, func, args):
+    """Работа в потоке пула: соединения живут, как между запросами."""
+    timings = getattr(request, 'timings', None)
+    close_old_connections()
+    try:
+        with timings.track_queries() if timings else nullcontext():
+            return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_db(request, func, *args):
+    """Выполняем синхронную работу с базой в пуле потоков."""
+    # Копия контекста несёт в поток выбор базы для чтения.
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, context.run, call, request, func, args
+    )
+
+
+def render_view(view, request, kwargs):
+    """Отрисовываем ответ в потоке пула, а не в общем потоке Django."""
+    response = view(request, **kwargs)
+    # Поток ответа перебирает StreamingASGIHandler, а не этот поток.
+    if not response.streaming and callable(getattr(response, 'render', None)):
+        timings = getattr(request, 'timings', None)
+        if timings:
+            timings.track_template(response)
+        response.render()
+    return response
+
+
+async def run_view(view, request, **kwargs):
+    return await run_db(request, render_view, view, request, kwargs)
+
+
+def load_news(pk):
+    # Страница с этой новостью может попасть в кеш страниц.
+    with read_from_primary():
+        return get_object_or_404(News, pk=pk)
+
+
+def shared_page(key):
+    return page_cache.get_page(key, page_cache.get_version(key))
+
+
+async def cached_page(request, key):
+    """Страница из кеша для анонима без параметров или None."""
+    if request.GET or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+    # В цикле событий — только память процесса: канал и общий кеш
+    # читаются с диска или по сети, это работа для пула.
+    page = page_cache.get_local_page(key)
+    if page is None:
+        page = await run_db(request, shared_page, key)
+    if page is None:
+        return None
+    return views.page_response(request, page)
+
+
+async def news_list(request):
+    """Главная страница."""
+    if request.method == 'GET':
+        response = await cached_page(request, page_cache.home_page_key())
+        if response is not None:
+            return response
+    return await run_view(views.NewsList.as_view(), request)
+
+
+async def news_detail(request, pk):
+    """Страница новости; комментарии отправляются синхронным путём."""
+    if request.method != 'GET':
+        return await run_view(views.NewsDetailView.as_view(), request, pk=pk)
+    response = await cached_page(request, page_cache.detail_page_key(pk))
+    if response is not None:
+        view_counter.hit(pk)
+        return response
+    news = await flights.run(('news', pk), run_db, request, load_news, pk)
+    return await run_view(
+        views.NewsDetail.as_view(news=news), request, pk=pk
+    )
+
+
+async def send_status(send, status):
+    await send({'type': 'http.response.start', 'status': status})
+    await send({'type': 'http.response.body'})
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def news_events(scope, receive, send, pk):
+    """
+    Поток новых комментариев новости.
+
+    Все соединения одной новости на одной позиции читают пачку из базы
+    один раз. Без уведомлений соединение раз в COMMENT_EVENTS_KEEPALIVE
+    секунд шлёт keepalive и заново проверяет базу: так доходят и
+    комментарии, записанные другими процессами.
+    """
+    headers = dict(scope['headers'])
+    query = QueryDict(scope['query_string'].decode())
+    try:
+        position = events.parse_position(
+            headers.get(b'last-event-id', b'').decode() or query.get('after')
+        )
+        position = await run_db(None, events.start_position, pk, position)
+    except BadRequest:
+        return await send_status(send, 400)
+    except Http404:
+        return await send_status(send, 404)
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', events.CONTENT_TYPE.encode()),
+            (b'cache-control', b'no-cache'),
+            # Прокси не должен копить поток в буфере.
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    body = events.preamble(position)
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        with events.comment_events.subscribe(pk) as subscription:
+            while not disconnected.done():
+                if body:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': body.encode(),
+                        'more_body': True,
+                    })
+                subscription.event.clear()
+                batch = await flights.run(
+                    ('events', pk, position),
+                    run_db, None, events.comments_after, pk, position,
+                )
+                position = batch.last_id
+                body = batch.data
+                if body and batch.full:
+                    continue
+                if not body:
+                    notified = asyncio.ensure_future(subscription.event.wait())
+                    await asyncio.wait(
+                        (notified, disconnected),
+                        timeout=settings.COMMENT_EVENTS_KEEPALIVE,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    notified.cancel()
+                    if not subscription.event.is_set():
+                        body = events.KEEPALIVE
+    finally:
+        disconnected.cancel()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGI-обработчик Django, который перебирает потоковые ответы в пуле.
+
+    Весь перебор идёт в одном потоке stream_executor: курсор не уходит
+    от своего соединения. Части ответа отправляются по одной через цикл
+    событий, и поток ждёт отправки каждой, поэтому ни время до первого
+    байта, ни память не зависят от длины ответа, а медленный клиент
+    задерживает только свой поток.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        loop = asyncio.get_running_loop()
+
+        def send_body(chunk):
+            asyncio.run_coroutine_threadsafe(send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            }), loop).result()
+
+        await loop.run_in_executor(
+            stream_executor,
+            contextvars.copy_context().run,
+            self.stream, response, send_body,
+        )
+        await send({'type': 'http.response.body'})
+
+    def stream(self, response, send_body):
+        close_old_connections()
+        try:
+            for part in response:
+                for chunk, _ in self.chunk_bytes(part):
+                    send_body(chunk)
+        finally:
+            # request_finished закрывает соединение этого потока.
+            response.close()
+
+
+def with_events(application):
+    """ASGI-приложение: потоки комментариев отдаём сами, остальное — Django."""
+    async def app(scope, receive, send):
+        if scope['type'] == 'http':
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match and match.view_name == 'news:events':
+                return await news_events(scope, receive, send, **match.kwargs)
+        return await application(scope, receive, send)
+    return app
@@ -0,0 +1,261 @@
+"""
+Кеш готовых страниц и их фрагментов.
+
+У каждой страницы есть версия. Закешированный ответ хранится под ключом
+с версией, а сброс страницы лишь увеличивает версию: ответ, собранный
+по устаревшим данным, окажется под старым ключом и больше не прочитается.
+
+Кеш двухуровневый. Перед общим кешем Django стоит LRU в памяти процесса
+с ограниченным временем жизни записей, поэтому горячие страницы
+отдаются без обращения к общему кешу. Версии в памяти процесса
+сбрасываются через канал — файл, в конец которого сбрасывающий
+процесс дописывает ключи. Перед каждым чтением процесс сверяет размер
+файла и дочитывает новые строки, так что после нового комментария ни
+один процесс не отдаст устаревшую страницу. Забытую версию процесс
+перечитывает из общего кеша, поэтому кеш у процессов должен быть
+действительно общим: с LocMemCache приложение не запускается.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.http import quote_etag
+
+# Размер файла канала, после которого он начинается заново.
+CHANNEL_MAX_SIZE = 1 << 20
+
+
+class LocalCache:
+    """LRU в памяти процесса с временем жизни записей."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class InvalidationChannel:
+    """
+    Сброшенные ключи, общие для процессов одной машины.
+
+    Запись — дописывание строки в конец файла, чтение — дочитывание
+    строк после запомненной позиции. Если файл стал короче позиции,
+    его начали заново, и процесс сбрасывает все версии в памяти.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.position = self.size()
+
+    def size(self):
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def publish(self, keys):
+        if self.size() > CHANNEL_MAX_SIZE:
+            open(self.path, 'w').close()
+        with open(self.path, 'a', encoding='utf-8') as channel:
+            channel.write(''.join(f'{key}\n' for key in keys))
+
+    def poll(self):
+        """
+        Ключи, сброшенные с прошлого вызова.
+
+        None — канал начат заново, сбросить нужно всё.
+        """
+        size = self.size()
+        if size == self.position:
+            return []
+        with self.lock:
+            if size < self.position:
+                self.position = 0
+                return None
+            with open(self.path, 'rb') as channel:
+                channel.seek(self.position)
+                data = channel.read()
+            # Последняя строка может быть дописана не до конца.
+            data = data[:data.rfind(b'\n') + 1]
+            self.position += len(data)
+        return data.decode().splitlines()
+
+
+local_cache = LocalCache(
+    settings.PAGE_CACHE_LOCAL['MAX_ENTRIES'],
+    settings.PAGE_CACHE_LOCAL['TIMEOUT'],
+)
+channel = InvalidationChannel(settings.PAGE_CACHE_CHANNEL)
+# Когда процесс последний раз применил сбросы из канала.
+synced_at = time.monotonic()
+
+
+@receiver(setting_changed)
+def switch_cache(setting, **kwargs):
+    """Тесты переносят кеш в свой каталог: забываем страницы прежнего."""
+    global channel
+    if setting == 'PAGE_CACHE_CHANNEL':
+        channel = InvalidationChannel(settings.PAGE_CACHE_CHANNEL)
+    if setting in ('CACHES', 'PAGE_CACHE_CHANNEL'):
+        local_cache.clear()
+
+
+def check_shared_cache():
+    """Версии страниц должны быть видны всем процессам сайта."""
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        raise ImproperlyConfigured(
+            'Кеш страниц требует общего для процессов кеша: LocMemCache '
+            'хранит версии страниц в памяти каждого процесса.'
+        )
+
+
+def version_key(key):
+    return f'{key}:version'
+
+
+def sync_local():
+    """Забываем версии, которые сбросили другие процессы."""
+    global synced_at
+    started = time.monotonic()
+    keys = channel.poll()
+    if keys is None:
+        local_cache.clear()
+    for key in keys or ():
+        local_cache.delete(version_key(key))
+    synced_at = max(synced_at, started)
+
+
+def clear():
+    """Очищаем оба уровня кеша."""
+    cache.clear()
+    local_cache.clear()
+
+
+def home_page_key():
+    return 'page:home'
+
+
+def detail_page_key(news_id):
+    return f'page:detail:{news_id}'
+
+
+def comments_key(news_id):
+    return f'fragment:comments:{news_id}'
+
+
+def make_etag(*parts):
+    """Значение ETag по данным, от которых зависит ответ."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def get_version(key):
+    sync_local()
+    version = local_cache.get(version_key(key))
+    if version is None:
+        version = cache.get(version_key(key))
+        if version is None:
+            cache.add(version_key(key), time.time_ns(), None)
+            version = cache.get(version_key(key))
+        local_cache.set(version_key(key), version)
+    return version
+
+
+def get_local_page(key):
+    """
+    Страница из памяти процесса либо None.
+
+    Не читает ни файл канала, ни общий кеш, поэтому годится для цикла
+    событий. Сбросы из других процессов применяет sync_local, и если он
+    давно не вызывался, версия в памяти могла устареть — тогда тоже None.
+    """
+    max_age = settings.PAGE_CACHE_LOCAL['SYNC_INTERVAL']
+    if time.monotonic() - synced_at > max_age:
+        return None
+    version = local_cache.get(version_key(key))
+    if version is None:
+        return None
+    return local_cache.get(stored_key(key, version))
+
+
+def stored_key(key, version, variant=''):
+    """Ключ, под которым лежит версия страницы (или её вариант)."""
+    return f'{key}:{version}:{variant}'
+
+
+def get_page(key, version, variant=''):
+    """Закешированная страница (или её вариант) либо None."""
+    page_key = stored_key(key, version, variant)
+    page = local_cache.get(page_key)
+    if page is None:
+        page = cache.get(page_key)
+        if page is not None:
+            local_cache.set(page_key, page)
+    return page
+
+
+def set_page(key, version, page, variant=''):
+    page_key = stored_key(key, version, variant)
+    cache.set(page_key, page, None)
+    local_cache.set(page_key, page)
+
+
+def bump_versions(keys):
+    for key in keys:
+        local_cache.delete(version_key(key))
+        try:
+            cache.incr(version_key(key))
+        except ValueError:
+            # Версии нет — значит, и страниц под ней никто не найдёт.
+            pass
+    channel.publish(keys)
+
+
+def invalidate(*keys):
+    """
+    Сбрасываем страницы сейчас и ещё раз после фиксации транзакции.
+
+    Повторный сброс отбрасывает то, что успели собрать по данным,
+    которые видели другие запросы до коммита.
+    """
+    bump_versions(keys)
+    transaction.on_commit(lambda: bump_versions(keys))
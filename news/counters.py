@@ -0,0 +1,152 @@
+"""
+Счётчики просмотров и рейтинг популярных новостей.
+
+Просмотры копятся в памяти процесса, и фоновый поток раз в
+VIEW_COUNTS_FLUSH_INTERVAL секунд записывает их одним UPDATE ... CASE
+на пачку новостей, а не отдельной записью на каждый просмотр. Запрос
+только прибавляет просмотр в буфер, поэтому ошибка записи не ломает
+страницу: просмотры остаются в буфере до следующей попытки. Оставшиеся
+просмотры записываются при выходе из процесса. После записи пересчитывается
+рейтинг популярных новостей: он хранится в кеше, и если рейтинг
+изменился, главная страница сбрасывается. Просмотры не меняют время
+изменения новости, поэтому их число на страницах обновляется вместе
+со сбросом кеша, а не с каждым просмотром.
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import cache as page_cache
+from .models import News
+
+logger = logging.getLogger(__name__)
+
+POPULAR_KEY = 'ranking:popular'
+# Три параметра на новость: WHEN, THEN и IN — с запасом до лимита SQLite.
+FLUSH_BATCH_SIZE = 300
+
+
+def add_views(counts):
+    """Прибавляем просмотры одним UPDATE ... CASE на пачку новостей."""
+    items = sorted(counts.items())
+    with transaction.atomic():
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = items[start:start + FLUSH_BATCH_SIZE]
+            News.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                views=F('views') + Case(
+                    *(When(pk=pk, then=Value(count)) for pk, count in batch),
+                    default=Value(0),
+                )
+            )
+
+
+def refresh_popular():
+    """Пересчитываем рейтинг и сбрасываем главную, если он изменился."""
+    since = timezone.localdate() - timedelta(days=settings.POPULAR_NEWS_DAYS)
+    ranking = list(
+        News.objects.filter(date__gte=since, views__gt=0).order_by(
+            '-views', '-id'
+        ).values_list('id', flat=True)[:settings.POPULAR_NEWS_COUNT]
+    )
+    if cache.get(POPULAR_KEY) != ranking:
+        cache.set(POPULAR_KEY, ranking, None)
+        page_cache.invalidate(page_cache.home_page_key())
+    return ranking
+
+
+def get_popular_ids():
+    """
+    Id популярных новостей по убыванию просмотров.
+
+    Страницы не считают рейтинг сами: до первой записи просмотров он пуст.
+    """
+    return cache.get(POPULAR_KEY, [])
+
+
+class ViewCounter:
+    """Просмотры, ещё не записанные в базу, и поток, который их пишет."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def hit(self, news_id):
+        """Засчитываем просмотр; запрос не ждёт записи в базу."""
+        self.start()
+        with self.lock:
+            self.pending[news_id] += 1
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stopped.clear()
+            self.thread = threading.Thread(
+                target=self.run, name='view-counter', daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        """Останавливаем поток, он записывает оставшиеся просмотры."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.stopped.set()
+        thread.join()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.VIEW_COUNTS_FLUSH_INTERVAL):
+                self.flush_logged()
+            self.flush_logged()
+        finally:
+            connections.close_all()
+
+    def flush_logged(self):
+        # Ошибка не должна останавливать поток: следующая запись повторит.
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Не удалось записать просмотры.')
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        """
+        Записываем накопленное.
+
+        Запись идёт в одной транзакции, поэтому при любой ошибке
+        просмотры возвращаются в буфер и будут записаны в следующий раз;
+        возвращаем, удалась ли запись.
+        """
+        with self.lock:
+            counts, self.pending = self.pending, Counter()
+        if not counts:
+            return True
+        try:
+            add_views(counts)
+        except Exception:
+            logger.exception(
+                'Просмотры не записаны и останутся в буфере.'
+            )
+            with self.lock:
+                self.pending.update(counts)
+            return False
+        refresh_popular()
+        return True
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.stop)
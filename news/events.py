@@ -0,0 +1,147 @@
+"""
+Новые комментарии к новости как server-sent events.
+
+Сигналы после фиксации транзакции публикуют id новостей, к которым
+добавились комментарии. Подписка не хранит сами комментарии: она
+только будит соединение, а то читает из базы комментарии после своего
+последнего id, не больше COMMENT_EVENTS_BATCH_SIZE за раз. Поэтому
+память соединения ограничена одной пачкой, медленный клиент ничего не
+теряет, а после переподключения браузер присылает Last-Event-ID и
+получает пропущенное. Под ASGI соединение держит асинхронное
+приложение из async_views, под WSGI представление отдаёт накопившееся
+и закрывает ответ, а браузер переподключается через
+COMMENT_EVENTS_RETRY миллисекунд.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.shortcuts import get_object_or_404
+
+from .models import Comment, News
+
+CONTENT_TYPE = 'text/event-stream; charset=utf-8'
+KEEPALIVE = ': ping\n\n'
+
+EventBatch = namedtuple('EventBatch', ('last_id', 'data', 'full'))
+
+
+class Subscription:
+    """Подписка одного соединения; уведомления приходят из любых потоков."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def notify(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+
+class CommentEvents:
+    """Подписки на новые комментарии по id новостей."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, news_id):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions[news_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self.lock:
+                subscriptions = self.subscriptions[news_id]
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[news_id]
+
+    def publish(self, news_ids):
+        with self.lock:
+            subscriptions = [
+                subscription
+                for news_id in news_ids
+                for subscription in self.subscriptions.get(news_id, ())
+            ]
+        for subscription in subscriptions:
+            try:
+                subscription.notify()
+            except RuntimeError:
+                # Цикл событий соединения уже закрыт.
+                pass
+
+
+comment_events = CommentEvents()
+
+
+def parse_position(value):
+    """Id последнего полученного комментария из Last-Event-ID."""
+    if not value:
+        return None
+    try:
+        position = int(value)
+    except ValueError:
+        position = -1
+    if position < 0:
+        raise BadRequest('Некорректный Last-Event-ID.')
+    return position
+
+
+def start_position(news_id, position=None):
+    """
+    С какого комментария начинать.
+
+    Без Last-Event-ID клиент получает только комментарии, добавленные
+    после подключения.
+    """
+    get_object_or_404(News.objects.only('pk'), pk=news_id)
+    if position is not None:
+        return position
+    return Comment.objects.filter(news_id=news_id).aggregate(
+        last_id=Max('pk')
+    )['last_id'] or 0
+
+
+def preamble(position):
+    """
+    Начало потока: интервал переподключения и исходная позиция.
+
+    Событие без данных не доходит до страницы, но его id браузер
+    пришлёт в Last-Event-ID.
+    """
+    return f'retry: {settings.COMMENT_EVENTS_RETRY}\nid: {position}\n\n'
+
+
+def format_event(pk, author, text, created):
+    data = json.dumps(
+        {'id': pk, 'author': author, 'text': text, 'created': created},
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+    )
+    return f'id: {pk}\nevent: comment\ndata: {data}\n\n'
+
+
+def comments_after(news_id, position):
+    """Пачка событий с комментариями новости после position."""
+    limit = settings.COMMENT_EVENTS_BATCH_SIZE
+    rows = list(
+        Comment.objects.filter(news_id=news_id, pk__gt=position)
+        .order_by('pk')
+        .values_list('pk', 'author__username', 'text', 'created')[:limit]
+    )
+    if not rows:
+        return EventBatch(position, '', False)
+    return EventBatch(
+        rows[-1][0],
+        ''.join(format_event(*row) for row in rows),
+        len(rows) == limit,
+    )
@@ -0,0 +1,113 @@
+"""
+Потоковая выгрузка новостей и комментариев в NDJSON.
+
+Каждая строка — отдельный объект в формате dumpdata, только автор
+комментария выгружается по username. Таблицы обходятся пачками по
+возрастанию id, поэтому память не зависит от их размера, а выгрузку
+можно продолжить с последнего полученного id. С since выгружаются
+новости, изменённые с этого момента (в том числе получившие
+комментарии), и комментарии, созданные с него.
+"""
+
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, News
+
+MODELS = ('news', 'comments')
+
+
+def parse_since(value):
+    """Дата или дата со временем из строки; наивные — в текущей зоне."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError(f'Некорректная дата: {value}')
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def iter_batches(queryset, fields, since_id, batch_size):
+    """Обходим выборку пачками по id, начиная после since_id."""
+    last_id = since_id or 0
+    while True:
+        batch = queryset.filter(pk__gt=last_id).order_by('pk').values_list(
+            'pk', *fields
+        )[:batch_size]
+        rows = 0
+        for row in batch.iterator(chunk_size=batch_size):
+            rows += 1
+            last_id = row[0]
+            yield row
+        if rows < batch_size:
+            return
+
+
+def iter_news(since=None, since_id=None, batch_size=1000):
+    queryset = News.objects.all()
+    if since is not None:
+        # По времени изменения, а не по дате публикации: иначе
+        # отредактированные новости не попадут в выгрузку.
+        queryset = queryset.filter(modified__gte=since)
+    fields = ('title', 'text', 'date')
+    for pk, title, text, date in iter_batches(
+        queryset, fields, since_id, batch_size
+    ):
+        yield {
+            'model': 'news.news',
+            'pk': pk,
+            'fields': {'title': title, 'text': text, 'date': date},
+        }
+
+
+def iter_comments(since=None, since_id=None, batch_size=1000):
+    queryset = Comment.objects.all()
+    if since is not None:
+        queryset = queryset.filter(created__gte=since)
+    fields = ('news_id', 'author__username', 'text', 'created')
+    for pk, news_id, author, text, created in iter_batches(
+        queryset, fields, since_id, batch_size
+    ):
+        yield {
+            'model': 'news.comment',
+            'pk': pk,
+            'fields': {
+                'news': news_id,
+                'author': author,
+                'text': text,
+                'created': created,
+            },
+        }
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def export_lines(
+        models=MODELS, since=None, news_since_id=None,
+        comments_since_id=None, batch_size=1000
+):
+    """Строки NDJSON: сначала новости, затем комментарии."""
+    sources = {
+        'news': lambda: iter_news(since, news_since_id, batch_size),
+        'comments': lambda: iter_comments(
+            since, comments_since_id, batch_size
+        ),
+    }
+    for name in MODELS:
+        if name not in models:
+            continue
+        for record in sources[name]():
+            yield json.dumps(
+                record, ensure_ascii=False, default=_default
+            ) + '\n'
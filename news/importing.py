@@ -0,0 +1,253 @@
+"""
+Быстрая загрузка новостей и комментариев из больших файлов.
+
+Файл разбирается потоково — и JSON-массив в формате dumpdata, и NDJSON
+из news.export. Записи вставляются пачками через bulk_create, каждая
+порция — в своей транзакции. Авторы комментариев находятся по username
+через словарь в памяти, недостающие пользователи создаются. Сигналы при
+bulk_create не отправляются, поэтому производные данные затронутых
+новостей пересчитываются в конце, а выдержки заполняются заранее.
+"""
+
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import cache as page_cache
+from .models import Comment, News, make_excerpt
+
+READ_SIZE = 1 << 16
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+class ImportDataError(ValueError):
+    """Запись в файле нельзя загрузить."""
+
+
+def read_more(file, tail=''):
+    chunk = file.read(READ_SIZE)
+    if not chunk:
+        raise ImportDataError('Неожиданный конец JSON-массива.')
+    return tail + chunk
+
+
+def iter_json_array(file):
+    """Объекты JSON-массива по одному, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ImportDataError('Ожидался JSON-массив.')
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if position == len(buffer):
+            buffer, position = read_more(file), 0
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Объект разрезан границей чтения: дочитываем и пробуем снова.
+            buffer, position = read_more(file, buffer[position:]), 0
+            continue
+        yield record
+
+
+def iter_ndjson(file):
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ImportDataError(f'Строка {number}: {error}')
+
+
+def detect_format(file):
+    """JSON-массив или NDJSON — по первому значащему символу файла."""
+    while True:
+        char = file.read(1)
+        if not char or not char.isspace():
+            break
+    file.seek(0)
+    return 'json' if char == '[' else 'ndjson'
+
+
+def iter_records(file, file_format):
+    if file_format == 'json':
+        return iter_json_array(file)
+    return iter_ndjson(file)
+
+
+class Importer:
+    """Копит записи и вставляет их порциями."""
+
+    def __init__(
+            self, batch_size=1000, chunk_size=20000, ignore_conflicts=False
+    ):
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.ignore_conflicts = ignore_conflicts
+        self.users = {}
+        self.password = make_password(None)
+        self.news = []
+        self.comments = []
+        self.authors = []
+        self.touched_news = set()
+        self.counts = {'news': 0, 'comments': 0, 'users': 0}
+
+    def add(self, record):
+        model = record.get('model')
+        if model not in ('news.news', 'news.comment'):
+            raise ImportDataError(f'Неизвестная модель: {model}')
+        fields = record.get('fields') or {}
+        try:
+            if model == 'news.news':
+                self.news.append(self.build_news(record.get('pk'), fields))
+            else:
+                self.comments.append(
+                    self.build_comment(record.get('pk'), fields)
+                )
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            raise ImportDataError(f'Некорректная запись {record!r}: {error}')
+        if len(self.news) + len(self.comments) >= self.chunk_size:
+            self.flush()
+
+    def build_news(self, pk, fields):
+        date = fields.get('date')
+        news = News(
+            pk=pk,
+            title=fields['title'],
+            text=fields['text'],
+            excerpt=make_excerpt(fields['text']),
+        )
+        if date:
+            news.date = parse_date(date[:10])
+            if news.date is None:
+                raise ValueError(f'некорректная дата {date}')
+        return news
+
+    def build_comment(self, pk, fields):
+        comment = Comment(
+            pk=pk, news_id=int(fields['news']), text=fields['text']
+        )
+        # Автор — username, натуральный ключ [username] или id;
+        # id по username подставим при записи порции.
+        author = fields['author']
+        if isinstance(author, list):
+            author = author[0]
+        if isinstance(author, int):
+            comment.author_id = author
+        else:
+            self.authors.append((comment, str(author)))
+        created = fields.get('created')
+        if created:
+            comment.created = parse_datetime(created)
+            if comment.created is None:
+                raise ValueError(f'некорректное время {created}')
+        return comment
+
+    def resolve_authors(self):
+        """Подставляем id авторов, создавая недостающих пользователей."""
+        User = get_user_model()
+        names = {name for _, name in self.authors} - self.users.keys()
+        if names:
+            self.users.update(User.objects.filter(
+                username__in=names
+            ).values_list('username', 'id'))
+            missing = names - self.users.keys()
+            if missing:
+                User.objects.bulk_create(
+                    (
+                        User(username=name, password=self.password)
+                        for name in missing
+                    ),
+                    batch_size=self.batch_size,
+                )
+                self.users.update(User.objects.filter(
+                    username__in=missing
+                ).values_list('username', 'id'))
+                self.counts['users'] += len(missing)
+        for comment, name in self.authors:
+            comment.author_id = self.users[name]
+
+    def count_new(self, model, objects):
+        """
+        Сколько объектов порции будет вставлено.
+
+        С ignore_conflicts строки с уже занятым id и повторы id внутри
+        порции пропускаются, поэтому их не считаем загруженными.
+        """
+        if not self.ignore_conflicts:
+            return len(objects)
+        pks = [obj.pk for obj in objects if obj.pk is not None]
+        unique = sorted(set(pks))
+        existing = sum(
+            model.objects.filter(
+                pk__in=unique[start:start + self.batch_size]
+            ).count()
+            for start in range(0, len(unique), self.batch_size)
+        )
+        return len(objects) - (len(pks) - len(unique)) - existing
+
+    def flush(self):
+        """Записываем накопленную порцию в одной транзакции."""
+        if not self.news and not self.comments:
+            return
+        with transaction.atomic():
+            self.resolve_authors()
+            news_count = self.count_new(News, self.news)
+            comments_count = self.count_new(Comment, self.comments)
+            News.objects.bulk_create(
+                self.news,
+                batch_size=self.batch_size,
+                ignore_conflicts=self.ignore_conflicts,
+            )
+            Comment.objects.bulk_create(
+                self.comments,
+                batch_size=self.batch_size,
+                ignore_conflicts=self.ignore_conflicts,
+            )
+        self.touched_news.update(
+            comment.news_id for comment in self.comments
+        )
+        self.counts['news'] += news_count
+        self.counts['comments'] += comments_count
+        self.news = []
+        self.comments = []
+        self.authors = []
+
+    def rebuild(self):
+        """Пересчитываем производные данные затронутых новостей."""
+        touched = sorted(self.touched_news)
+        for start in range(0, len(touched), self.batch_size):
+            ids = touched[start:start + self.batch_size]
+            with transaction.atomic():
+                News.objects.filter(pk__in=ids).recount_comments()
+        keys = [page_cache.home_page_key()]
+        for news_id in touched:
+            keys.append(page_cache.detail_page_key(news_id))
+            keys.append(page_cache.comments_key(news_id))
+        page_cache.invalidate(*keys)
+
+
+def import_records(records, **options):
+    """
+    Загружаем записи и возвращаем число созданных объектов.
+
+    Если загрузка прервалась, уже записанные порции остаются в базе,
+    и производные данные для них всё равно пересчитываются.
+    """
+    importer = Importer(**options)
+    try:
+        for record in records:
+            importer.add(record)
+        importer.flush()
+    finally:
+        importer.rebuild()
+    return importer.counts
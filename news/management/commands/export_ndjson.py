@@ -0,0 +1,46 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from news.export import MODELS, export_lines, parse_since
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает новости и комментарии в NDJSON. '
+        'Поддерживает выгрузку изменений с момента или после id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models', nargs='+', choices=MODELS, default=MODELS
+        )
+        parser.add_argument(
+            '--since',
+            help='Дата или дата со временем в ISO 8601: новости изменены, '
+            'комментарии созданы не раньше неё.'
+        )
+        parser.add_argument('--news-since-id', type=int)
+        parser.add_argument('--comments-since-id', type=int)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = options['since'] and parse_since(options['since'])
+        except ValidationError as error:
+            raise CommandError(error.messages[0])
+        lines = export_lines(
+            models=options['models'],
+            since=since or None,
+            news_since_id=options['news_since_id'],
+            comments_since_id=options['comments_since_id'],
+            batch_size=options['batch_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,59 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from news.importing import detect_format, import_records, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро загружает новости и комментарии из JSON-массива в формате '
+        'dumpdata или из NDJSON, минуя loaddata.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format', choices=('auto', 'json', 'ndjson'), default='auto',
+            help='Из stdin без явного формата читается NDJSON.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--chunk-size', type=int, default=20000,
+            help='Сколько записей вставлять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать записи с уже занятыми id.'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['path'] == '-':
+            file = sys.stdin
+            file_format = options['format'].replace('auto', 'ndjson')
+        else:
+            file = open(options['path'], encoding='utf-8')
+            file_format = options['format']
+            if file_format == 'auto':
+                file_format = detect_format(file)
+        try:
+            counts = import_records(
+                iter_records(file, file_format),
+                batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'],
+                ignore_conflicts=options['ignore_conflicts'],
+            )
+        except (IntegrityError, ValueError) as error:
+            raise CommandError(f'Загрузка прервана: {error}')
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        self.stdout.write(
+            f'Загружено новостей: {counts["news"]}, '
+            f'комментариев: {counts["comments"]}, '
+            f'создано пользователей: {counts["users"]} '
+            f'за {time.perf_counter() - start:.1f} с'
+        )
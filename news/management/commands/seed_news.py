@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.seeding import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро наполняет базу новостями, пользователями и комментариями. '
+        'Комментарии распределяются по новостям неравномерно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель закона Ципфа: чем больше, тем горячее топ.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['comments'] and not (options['users'] and options['news']):
+            raise CommandError(
+                'Для комментариев нужны хотя бы одна новость и один автор.'
+            )
+        start = time.perf_counter()
+        seed(
+            options['news'],
+            options['users'],
+            options['comments'],
+            skew=options['skew'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(
+            f'Создано новостей: {options["news"]}, '
+            f'пользователей: {options["users"]}, '
+            f'комментариев: {options["comments"]} '
+            f'за {time.perf_counter() - start:.1f} с'
+        )
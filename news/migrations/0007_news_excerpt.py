@@ -0,0 +1,68 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:05
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    db_alias = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        batch = list(News.objects.using(db_alias).filter(
+            pk__gt=last_id
+        ).order_by('pk').only('pk', 'text')[:1000])
+        if not batch:
+            break
+        for news in batch:
+            news.excerpt = Truncator(news.text).words(15, truncate=' …')
+        News.objects.using(db_alias).bulk_update(batch, ('excerpt',))
+        last_id = batch[-1].pk
+
+
+# AddField на SQLite пересоздаёт news_news, и триггеры поискового индекса
+# из 0006 удаляются вместе со старой таблицей.
+TRIGGERS_SQL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS news_news_fts_insert
+    AFTER INSERT ON news_news BEGIN
+        INSERT INTO news_news_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_news_fts_delete
+    AFTER DELETE ON news_news BEGIN
+        INSERT INTO news_news_fts(news_news_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_news_fts_update
+    AFTER UPDATE OF title, text ON news_news BEGIN
+        INSERT INTO news_news_fts(news_news_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO news_news_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_news_search'),
+    ]
+
+    operations = [
+        # При откате RemoveField тоже пересоздаёт таблицу.
+        migrations.RunSQL(migrations.RunSQL.noop, TRIGGERS_SQL),
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+        migrations.RunSQL(TRIGGERS_SQL, migrations.RunSQL.noop),
+    ]
@@ -2,15 +2,69 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 15
+
+
+def make_excerpt(text):
+    """Начало текста для списков новостей, как у фильтра truncatewords."""
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def recount_comments(self):
+        """Пересчитываем счётчики комментариев у новостей выборки."""
+        counts = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.update(
+            comment_count=Coalesce(Subquery(counts), 0),
+            modified=timezone.now(),
+        )
+
+    def refresh_excerpts(self, batch_size=1000):
+        """Пересчитываем выдержки новостей выборки пачками по id."""
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(self.filter(pk__gt=last_id).order_by('pk').only(
+                'pk', 'text'
+            )[:batch_size])
+            if not batch:
+                return updated
+            for news in batch:
+                news.excerpt = make_excerpt(news.text)
+            self.model.objects.bulk_update(batch, ('excerpt',))
+            updated += len(batch)
+            last_id = batch[-1].pk
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    # Заполняется сигналом при сохранении: списки не читают весь текст.
+    excerpt = models.TextField(default='', editable=False)
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Прибавляется пачками из news.counters, а не на каждый просмотр.
+    views = models.PositiveIntegerField(default=0, editable=False)
+    # Время последнего изменения новости или её комментариев.
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
@@ -28,10 +82,17 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    # Не auto_now_add: bulk_create при импорте сохраняет исходное время.
+    created = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
-        ordering = ('created',)
+        ordering = ('created', 'id')
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
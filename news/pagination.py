@@ -0,0 +1,96 @@
+"""Постраничный вывод по курсору (keyset pagination)."""
+
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+
+Page = namedtuple('Page', ('object_list', 'next_cursor'))
+
+
+class KeysetPaginator:
+    """
+    Делит выборку на страницы по значениям ключа сортировки.
+
+    Вместо OFFSET следующая страница начинается строго после последней
+    записи предыдущей, поэтому стоимость страницы не зависит от её
+    номера. Курсор непрозрачен для клиента: это закодированные значения
+    ключа последней записи.
+    """
+
+    def __init__(self, ordering, per_page):
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    def paginate(self, queryset, cursor=None):
+        """Возвращаем страницу, начинающуюся после курсора."""
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(
+                self._after(self.decode(cursor, queryset.model))
+            )
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode(rows[-1])
+        return Page(rows, next_cursor)
+
+    def encode(self, row):
+        """Кодируем ключ записи (объекта или словаря) в курсор."""
+        values = []
+        for name in self.fields:
+            value = row[name] if isinstance(row, dict) else getattr(
+                row, name
+            )
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor, model):
+        """Разбираем курсор, при ошибке отвечаем 400."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if (
+                not isinstance(values, list)
+                or len(values) != len(self.fields)
+            ):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (
+            binascii.Error, TypeError, ValueError, ValidationError
+        ):
+            raise BadRequest('Некорректный курсор.')
+
+    def _after(self, values):
+        """
+        Условие «строго после ключа» для составной сортировки.
+
+        По дизъюнкции SQLite не умеет переходить к ключу в индексе и
+        читает его с начала, поэтому первый столбец дополнительно
+        ограничен нестрогим неравенством: по нему индекс ищет начало
+        страницы, а остальное отсекает дизъюнкция.
+        """
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        bound = Q(**{f'{self.fields[0]}__{lookup}': values[0]})
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            for prev_index in range(index):
+                step &= Q(**{self.fields[prev_index]: values[prev_index]})
+            condition |= step
+        return bound & condition
@@ -0,0 +1,112 @@
+"""Поиск запрещённых слов в тексте за один проход."""
+
+import os
+import re
+import threading
+
+from django.conf import settings
+
+_END = ''
+
+
+def build_pattern(words):
+    """
+    Собираем из слов одно регулярное выражение в форме префиксного дерева.
+
+    Ветви дерева начинаются с разных символов, поэтому в каждой позиции
+    текста проверяется не больше одной ветви, и время поиска растёт
+    линейно с длиной текста независимо от числа слов.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_END] = True
+    return _node_to_regex(trie)
+
+
+def _node_to_regex(node):
+    if _END in node:
+        # Для поиска подстроки достаточно самого короткого слова.
+        return ''
+    branches = [
+        re.escape(char) + _node_to_regex(child)
+        for char, child in sorted(node.items())
+    ]
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+class WordMatcher:
+    """Скомпилированный набор запрещённых слов."""
+
+    def __init__(self, words):
+        words = {word.strip().lower() for word in words} - {''}
+        self.pattern = re.compile(build_pattern(words)) if words else None
+
+    def search(self, text):
+        """Есть ли в тексте хотя бы одно из слов."""
+        if self.pattern is None:
+            return False
+        return self.pattern.search(text.lower()) is not None
+
+
+def read_words(path):
+    """Читаем слова из файла: по одному в строке, # — комментарий."""
+    with open(path, encoding='utf-8') as file:
+        return [
+            line.strip() for line in file
+            if line.strip() and not line.lstrip().startswith('#')
+        ]
+
+
+class WordListSource:
+    """
+    Список слов из файла, который перечитывается при его изменении.
+
+    Автомат строится один раз на процесс и пересобирается, только если
+    у файла изменились время модификации или размер.
+    """
+
+    def __init__(self, path, default_words=()):
+        self.path = path
+        self.default_words = tuple(default_words)
+        self._stamp = None
+        self._matcher = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_matcher(self):
+        stamp = self._file_stamp()
+        if self._matcher is not None and stamp == self._stamp:
+            return self._matcher
+        with self._lock:
+            if self._matcher is None or stamp != self._stamp:
+                words = list(self.default_words)
+                if stamp is not None:
+                    words.extend(read_words(self.path))
+                self._matcher = WordMatcher(words)
+                self._stamp = stamp
+        return self._matcher
+
+
+_sources = {}
+
+
+def get_matcher(default_words=()):
+    """Автомат для файла из settings.BAD_WORDS_FILE."""
+    path = str(settings.BAD_WORDS_FILE)
+    source = _sources.get(path)
+    if source is None:
+        source = _sources.setdefault(
+            path, WordListSource(path, default_words)
+        )
+    return source.get_matcher()
@@ -1,14 +1,77 @@
 """Фикстуры для pytest."""
 
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from http import HTTPStatus
 from django.utils import timezone
 from django.conf import settings
+from django.db import connections
 from django.test.client import Client
+from django.test.utils import override_settings
+from django.urls import reverse
 
+from news import async_views
+from news import cache as page_cache
+from news.counters import view_counter
 from news.models import Comment, News
 
 
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmp_path_factory):
+    """
+    Свой каталог кеша и канала сбросов у каждого прогона.
+
+    Общий кеш машины нельзя очищать: в нём страницы работающего сайта.
+    Одинаково названные тестовые базы одновременных прогонов к тому же
+    читали бы страницы друг друга.
+    """
+    directory = tmp_path_factory.mktemp('cache')
+    caches = {
+        **settings.CACHES,
+        'default': {
+            **settings.CACHES['default'],
+            'LOCATION': directory / 'yanews-cache',
+        },
+    }
+    with override_settings(
+            CACHE_DIR=directory,
+            CACHES=caches,
+            PAGE_CACHE_CHANNEL=directory / 'yanews-page-cache.log',
+    ):
+        yield directory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(cache_dir):
+    """Каждый тест начинаем с пустым кешем прогона."""
+    page_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_view_counts():
+    """Незаписанные просмотры не переходят в следующий тест."""
+    yield
+    view_counter.pending.clear()
+    view_counter.stop()
+
+
+@pytest.fixture
+def executor(monkeypatch, transactional_db):
+    """
+    Пул из одного потока.
+
+    Поток пула работает со своим соединением и видит только
+    зафиксированные данные, поэтому тесты без транзакции.
+    """
+    executor = ThreadPoolExecutor(1)
+    monkeypatch.setattr(async_views, 'executor', executor)
+    monkeypatch.setattr(async_views, 'stream_executor', executor)
+    yield executor
+    executor.submit(connections.close_all).result()
+    executor.shutdown()
+
+
 @pytest.fixture
 # Используем встроенную фикстуру для модели пользователей django_user_model.
 def author(django_user_model):
@@ -107,3 +170,26 @@ def form_data():
     return {
         'text': 'Новое Бла-бла',
     }
+
+
+# Наибольшее допустимое число SQL-запросов на страницу при пустом кеше.
+QUERY_BUDGETS = {
+    'news:home': 3,
+    'news:archive': 3,
+    'news:detail': 4,
+    'news:comments': 3,
+    'news:edit': 3,
+    'news:delete': 3,
+}
+
+
+@pytest.fixture
+def assert_query_budget(django_assert_max_num_queries):
+    """Проверяем, что страница укладывается в свой бюджет запросов."""
+    def check(client, name, args=None):
+        page_cache.clear()
+        with django_assert_max_num_queries(QUERY_BUDGETS[name]) as context:
+            response = client.get(reverse(name, args=args))
+        assert response.status_code == HTTPStatus.OK
+        return len(context.captured_queries)
+    return check
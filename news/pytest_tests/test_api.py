@@ -0,0 +1,83 @@
+"""Тестирование JSON API через pytest."""
+
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+
+from news.models import Comment, News
+
+
+def test_news_list_fields_and_cursor(
+        client, news10_in_one_page, settings, django_assert_num_queries
+):
+    """Список отдаёт выбранные поля страницами по курсору."""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 4
+    url = reverse('news:api_news_list')
+    seen = []
+    cursor = ''
+    while True:
+        with django_assert_num_queries(1):
+            data = client.get(url, {'fields': 'id,title', 'cursor': cursor})
+        data = data.json()
+        assert all(set(row) == {'id', 'title'} for row in data['results'])
+        seen.extend(row['id'] for row in data['results'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert seen == list(
+        News.objects.order_by('-date', '-id').values_list('id', flat=True)
+    )
+
+
+def test_unknown_field(client):
+    """Неизвестное поле даёт 400."""
+    response = client.get(reverse('news:api_news_list'), {'fields': 'пароль'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    'name',
+    ('news:api_news_list', 'news:api_news_detail', 'news:api_comments')
+)
+def test_not_modified(client, name, news, comment, django_assert_num_queries):
+    """Актуальный ETag даёт 304 без тела за один запрос к базе."""
+    args = None if name == 'news:api_news_list' else (news.pk,)
+    url = reverse(name, args=args)
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response['Last-Modified']
+    with django_assert_num_queries(1):
+        cached = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert cached.content == b''
+    Comment.objects.create(news=news, author=comment.author, text='Новый')
+    fresh = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert fresh.status_code == HTTPStatus.OK
+    assert fresh['ETag'] != response['ETag']
+
+
+def test_news_detail(client, news):
+    """Новость отдаётся целиком или выбранными полями."""
+    url = reverse('news:api_news_detail', args=(news.pk,))
+    assert client.get(url, {'fields': 'title'}).json() == {
+        'title': news.title
+    }
+    assert client.get(url).json()['text'] == news.text
+
+
+def test_news_detail_not_found(client):
+    url = reverse('news:api_news_detail', args=(0,))
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_comments(client, news, comment10_in_one_page_news, settings):
+    """Комментарии отдаются с автором по username."""
+    settings.COMMENTS_COUNT_ON_PAGE = 3
+    url = reverse('news:api_comments', args=(news.pk,))
+    data = client.get(url, {'fields': 'id,author'}).json()
+    assert data['results'] == [
+        {'id': comment.pk, 'author': comment.author.username}
+        for comment in comment10_in_one_page_news[:3]
+    ]
+    assert data['next_cursor']
@@ -0,0 +1,206 @@
+"""Тестирование асинхронных представлений через pytest."""
+
+import asyncio
+import re
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+
+from news import async_views
+from news import cache as page_cache
+from news.models import Comment
+from yanews.metrics import MetricsMiddleware
+
+
+def make_request(news, user=None):
+    request = AsyncRequestFactory().get(
+        reverse(settings.URL['detail'], args=(news.pk,))
+    )
+    request.user = user or AnonymousUser()
+    if user:
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'session'
+    return request
+
+
+def get_detail(news, user=None):
+    return async_to_sync(async_views.news_detail)(
+        make_request(news, user), pk=news.pk
+    )
+
+
+def test_detail(executor, client, news):
+    """Страница совпадает со страницей синхронного представления."""
+    response = get_detail(news)
+    assert response.status_code == HTTPStatus.OK
+    expected = client.get(reverse(settings.URL['detail'], args=(news.pk,)))
+    assert response['ETag'] == expected['ETag']
+    assert response.content == expected.content
+
+
+def test_cached_detail_skips_executor(executor, monkeypatch, news, settings):
+    """Страница из памяти отдаётся без пула, канала и общего кеша."""
+    settings.PAGE_CACHE_LOCAL = {**settings.PAGE_CACHE_LOCAL,
+                                 'SYNC_INTERVAL': 60}
+    etag = get_detail(news)['ETag']
+
+    async def fail_async(*args):
+        raise AssertionError('Пул не нужен.')
+
+    def fail(*args):
+        raise AssertionError('Не в цикле событий.')
+
+    monkeypatch.setattr(async_views, 'run_db', fail_async)
+    monkeypatch.setattr(page_cache, 'sync_local', fail)
+    monkeypatch.setattr(page_cache.cache, 'get', fail)
+    response = get_detail(news)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] == etag
+
+
+def test_stale_memory_checked_in_executor(executor, monkeypatch, news):
+    """Давно не сверялись с каналом — страница ищется в пуле."""
+    etag = get_detail(news)['ETag']
+    monkeypatch.setattr(page_cache, 'synced_at', float('-inf'))
+    calls = []
+    run_db = async_views.run_db
+
+    async def counting_run_db(request, func, *args):
+        calls.append(func)
+        return await run_db(request, func, *args)
+
+    monkeypatch.setattr(async_views, 'run_db', counting_run_db)
+    response = get_detail(news)
+    assert response['ETag'] == etag
+    assert calls == [async_views.shared_page]
+
+
+def test_detail_for_user(executor, news, author):
+    """Вошедший пользователь получает форму, страница не кешируется."""
+    response = get_detail(news, author)
+    assert 'form' in response.context_data
+    assert 'form' in get_detail(news, author).context_data
+
+
+def test_concurrent_requests_share_fetch(executor, monkeypatch, news):
+    """Одновременные запросы новости читают её из базы один раз."""
+    calls = []
+
+    def load_news(pk):
+        calls.append(pk)
+        return async_views.News.objects.get(pk=pk)
+
+    monkeypatch.setattr(async_views, 'load_news', load_news)
+
+    async def get_many():
+        return await asyncio.gather(*(
+            async_views.news_detail(make_request(news), pk=news.pk)
+            for _ in range(5)
+        ))
+
+    responses = async_to_sync(get_many)()
+    assert calls == [news.pk]
+    assert {response.status_code for response in responses} == {
+        HTTPStatus.OK
+    }
+
+
+def test_missing_news(executor, news):
+    request = make_request(news)
+    pk = news.pk
+    news.delete()
+    with pytest.raises(Http404):
+        async_to_sync(async_views.news_detail)(request, pk=pk)
+
+
+def test_single_flight_releases_key():
+    """После завершения вызова ключ свободен и ошибка не запоминается."""
+    flights = async_views.SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        if value is None:
+            raise ValueError
+        return value
+
+    async def run():
+        with pytest.raises(ValueError):
+            await flights.run('key', fetch, None)
+        return await flights.run('key', fetch, 1)
+
+    assert asyncio.run(run()) == 1
+    assert calls == [None, 1]
+
+
+def test_metrics_count_executor_queries(executor, news):
+    """Асинхронный путь передаёт в Server-Timing запросы из пула."""
+    async def view(request):
+        return await async_views.news_detail(request, pk=news.pk)
+
+    middleware = MetricsMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = async_to_sync(middleware)(make_request(news))
+    match = re.search(r'desc="(\d+) queries", tpl', response['Server-Timing'])
+    assert int(match[1]) > 0
+
+
+def test_streaming_detail_sent_in_parts(executor, news, author, settings):
+    """Ветка отдаётся частями, а читается в пуле, а не в цикле событий."""
+    settings.COMMENTS_STREAM_CHUNK_SIZE = 1
+    for index in range(2):
+        Comment.objects.create(
+            news=news, author=author, text=f'Комментарий {index}'
+        )
+    request = AsyncRequestFactory().get(
+        reverse(settings.URL['detail'], args=(news.pk,)) + '?comments=all'
+    )
+    request.user = AnonymousUser()
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def get():
+        response = await async_views.news_detail(request, pk=news.pk)
+        assert response.streaming
+        # Без пула перебор в цикле событий упал бы на запросе к базе.
+        await async_views.StreamingASGIHandler().send_response(response, send)
+
+    async_to_sync(get)()
+    assert messages[0]['status'] == HTTPStatus.OK
+    bodies = [message['body'].decode() for message in messages[1:-1]]
+    # Шапка, по комментарию на часть и конец страницы.
+    assert len(bodies) == 4
+    assert 'Комментарий 0' in bodies[1]
+    assert 'Комментарий 1' in bodies[2]
+    assert messages[-1] == {'type': 'http.response.body'}
+
+
+def test_asgi_handler_streams_sync_view(executor, news, author):
+    """Потоковый ответ синхронного представления тоже читается в пуле."""
+    Comment.objects.create(news=news, author=author, text='Комментарий')
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': reverse(settings.URL['detail'], args=(news.pk,)),
+        'query_string': b'comments=all',
+        'headers': [(b'host', b'testserver')],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(async_views.StreamingASGIHandler())(scope, receive, send)
+    assert messages[0]['status'] == HTTPStatus.OK
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+    assert 'Комментарий' in content.decode()
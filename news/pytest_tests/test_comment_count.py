@@ -0,0 +1,101 @@
+"""Тестирование счётчика комментариев через pytest."""
+
+from django.conf import settings
+from django.core.management import call_command
+from django.urls import reverse
+
+from news.models import Comment, News
+
+
+def test_comment_create_increments_count(comment, news):
+    """Создание комментария увеличивает счётчик."""
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def test_comment_delete_decrements_count(comment, news):
+    """Удаление комментария уменьшает счётчик."""
+    comment.delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_bulk_delete_keeps_count(comment10_in_one_page_news, news):
+    """Удаление через QuerySet.delete() тоже учитывается."""
+    Comment.objects.filter(
+        pk__in=[comment.pk for comment in comment10_in_one_page_news[:4]]
+    ).delete()
+    news.refresh_from_db()
+    assert news.comment_count == 6
+
+
+def test_cascade_delete_keeps_count(comment, not_author, news):
+    """Каскадное удаление автора уменьшает счётчик."""
+    Comment.objects.create(news=news, author=not_author, text='Текст')
+    not_author.delete()
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def news_updates(context):
+    return [
+        query for query in context.captured_queries
+        if query['sql'].startswith('UPDATE "news_news"')
+    ]
+
+
+def test_cascade_delete_updates_news_once(
+        author, not_author, news, django_assert_max_num_queries
+):
+    """Счётчики новостей удаляемого автора обновляются одним UPDATE."""
+    other = News.objects.create(title='Другая', text='Текст')
+    Comment.objects.bulk_create(
+        Comment(news=item, author=not_author, text='Текст')
+        for item in (news, other) for _ in range(5)
+    )
+    News.objects.recount_comments()
+    Comment.objects.create(news=news, author=author, text='Текст')
+    with django_assert_max_num_queries(100) as context:
+        not_author.delete()
+    assert len(news_updates(context)) == 1
+    news.refresh_from_db()
+    other.refresh_from_db()
+    assert (news.comment_count, other.comment_count) == (1, 0)
+
+
+def test_news_delete_does_not_update_news(
+        comment10_in_one_page_news, news, django_assert_num_queries
+):
+    """Комментарии удаляемой новости не трогают её счётчик."""
+    with django_assert_num_queries(3) as context:
+        news.delete()
+    assert not news_updates(context)
+
+
+def test_delete_with_drifted_count(comment, news):
+    """Разошедшийся счётчик не ломает удаление и восстанавливается."""
+    News.objects.update(comment_count=0)
+    comment.delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_recount_command(comment10_in_one_page_news, news):
+    """Команда восстанавливает разошедшиеся счётчики."""
+    News.objects.update(comment_count=100)
+    call_command('recount_comments')
+    news.refresh_from_db()
+    assert news.comment_count == len(comment10_in_one_page_news)
+
+
+def test_home_page_does_not_load_comments(
+        client, news10_in_one_page, comment10_in_one_page_news,
+        django_assert_num_queries
+):
+    """Главная страница выводит счётчик одним запросом."""
+    url = reverse(settings.URL['home'])
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert f'Комментариев: {len(comment10_in_one_page_news)}' in (
+        response.content.decode()
+    )
@@ -0,0 +1,86 @@
+"""Тестирование условных GET-запросов к страницам через pytest."""
+
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+from news import cache as page_cache
+from news.models import Comment
+
+PAGES = (
+    ('news:home', None),
+    ('news:detail', pytest.lazy_fixture('news_id')),
+)
+
+
+@pytest.mark.parametrize('name, args', PAGES)
+@pytest.mark.parametrize(
+    'parametrized_client, expected_queries',
+    (
+            # Новости; на попадании в кеш страниц — ни одного.
+            (pytest.lazy_fixture('client'), 1),
+            # Сессия, пользователь и новости.
+            (pytest.lazy_fixture('author_client'), 3),
+    )
+)
+def test_not_modified_before_rendering(
+        parametrized_client, expected_queries, name, args, comment,
+        django_assert_num_queries
+):
+    """Актуальный ETag даёт 304 одним запросом, без отрисовки шаблона."""
+    url = reverse(name, args=args)
+    etag = parametrized_client.get(url)['ETag']
+    page_cache.clear()
+    with django_assert_num_queries(expected_queries):
+        response = parametrized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert response['ETag'] == etag
+
+
+@pytest.mark.parametrize('name, args', PAGES)
+def test_cached_page_not_modified(
+        client, name, args, django_assert_num_queries
+):
+    """Страница из кеша сверяет ETag без обращения к базе."""
+    url = reverse(name, args=args)
+    etag = client.get(url)['ETag']
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.parametrize('name, args', PAGES)
+def test_new_comment_changes_etag(client, name, args, news, author):
+    """После нового комментария страница отдаётся заново."""
+    url = reverse(name, args=args)
+    etag = client.get(url)['ETag']
+    Comment.objects.create(news=news, author=author, text='Новый')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_etag_depends_on_user(client, author_client, not_author_client, news):
+    """У гостя и у каждого пользователя свой ETag."""
+    url = reverse(settings.URL['detail'], args=(news.pk,))
+    etags = {
+        parametrized_client.get(url)['ETag']
+        for parametrized_client in (client, author_client, not_author_client)
+    }
+    assert len(etags) == 3
+
+
+def test_authorized_page_is_private(author_client, news):
+    """Страницу вошедшего пользователя не хранят общие кеши."""
+    url = reverse(settings.URL['detail'], args=(news.pk,))
+    cache_control = author_client.get(url)['Cache-Control']
+    assert 'private' in cache_control
+    assert 'no-cache' in cache_control
+
+
+def test_missing_news(client):
+    url = reverse(settings.URL['detail'], args=(0,))
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,131 @@
+"""Тестирование счётчиков просмотров и рейтинга через pytest."""
+
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.urls import reverse
+
+from news import counters
+from news.counters import ViewCounter, get_popular_ids, view_counter
+from news.models import News
+
+
+def test_views_are_buffered(
+        client, news, news_id, django_assert_num_queries
+):
+    """Просмотры копятся в памяти и записываются одним UPDATE."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    for _ in range(3):
+        client.get(url)
+    news.refresh_from_db()
+    assert news.views == 0
+    # SAVEPOINT, UPDATE ... CASE, RELEASE, пересчёт рейтинга.
+    with django_assert_num_queries(4) as context:
+        view_counter.flush()
+    assert 'CASE WHEN' in context.captured_queries[1]['sql']
+    news.refresh_from_db()
+    assert news.views == 3
+
+
+def test_cached_and_not_modified_views_count(client, news, news_id):
+    """Ответ из кеша и 304 тоже считаются просмотрами."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    etag = client.get(url)['ETag']
+    client.get(url)
+    client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert view_counter.pending == {news.pk: 3}
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_flush_after_interval(transactional_db, client, news, settings):
+    """Просмотры записывает фоновый поток, а не запрос."""
+    settings.VIEW_COUNTS_FLUSH_INTERVAL = 0.05
+    client.get(reverse(settings.URL['detail'], args=(news.pk,)))
+    wait_for(lambda: not view_counter.pending)
+    view_counter.stop()
+    news.refresh_from_db()
+    assert news.views == 1
+
+
+def test_failed_flush_keeps_views(monkeypatch, caplog, news):
+    def add_views(counts):
+        raise DatabaseError
+
+    monkeypatch.setattr(counters, 'add_views', add_views)
+    counter = ViewCounter()
+    counter.pending[news.pk] += 1
+    assert not counter.flush()
+    assert counter.pending == {news.pk: 1}
+    assert 'Просмотры не записаны' in caplog.text
+
+
+def test_failed_flush_does_not_fail_page(monkeypatch, client, news_id):
+    def add_views(counts):
+        raise DatabaseError
+
+    monkeypatch.setattr(counters, 'add_views', add_views)
+    url = reverse(settings.URL['detail'], args=news_id)
+    assert client.get(url).status_code == HTTPStatus.OK
+    assert not view_counter.flush()
+    assert client.get(url).status_code == HTTPStatus.OK
+    assert view_counter.pending == {news_id[0]: 2}
+
+
+def test_flusher_survives_errors(monkeypatch, settings):
+    """Поток продолжает попытки, пока база недоступна."""
+    settings.VIEW_COUNTS_FLUSH_INTERVAL = 0.01
+    calls = []
+
+    def add_views(counts):
+        calls.append(dict(counts))
+        raise RuntimeError
+
+    monkeypatch.setattr(counters, 'add_views', add_views)
+    counter = ViewCounter()
+    counter.hit(1)
+    wait_for(lambda: len(calls) > 1)
+    assert counter.thread.is_alive()
+    counter.stop()
+    assert calls[-1] == {1: 1}
+
+
+def test_ranking_refreshes_home(client, news10_in_one_page):
+    """Изменение рейтинга сбрасывает главную и меняет её ETag."""
+    url = reverse(settings.URL['home'])
+    etag = client.get(url)['ETag']
+    # bulk_create на SQLite не возвращает id.
+    hot, other = News.objects.all()[3:5]
+    view_counter.hit(hot.pk)
+    view_counter.hit(hot.pk)
+    view_counter.hit(other.pk)
+    view_counter.flush()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response['ETag'] != etag
+    assert [news.pk for news in response.context['popular']][0] == hot.pk
+
+
+def test_popular_order(client, news10_in_one_page, settings):
+    """Популярные новости выводятся по рейтингу."""
+    settings.POPULAR_NEWS_DAYS = 30
+    counts = {
+        pk: index for index, pk in enumerate(
+            News.objects.values_list('pk', flat=True)
+        )
+    }
+    counters.add_views(counts)
+    counters.refresh_popular()
+    response = client.get(reverse(settings.URL['home']), {'order': 'popular'})
+    expected = sorted(
+        (pk for pk, count in counts.items() if count),
+        key=counts.get, reverse=True,
+    )[:settings.POPULAR_NEWS_COUNT]
+    assert [news.pk for news in response.context['object_list']] == expected
+    assert get_popular_ids() == expected
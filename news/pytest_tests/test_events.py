@@ -0,0 +1,152 @@
+"""Тестирование живых комментариев через pytest."""
+
+import asyncio
+import json
+from functools import partial
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
+
+from news import async_views
+from news.events import comment_events, comments_after
+from news.models import Comment
+from news.signals import comments_created
+
+
+def parse_events(content):
+    """Данные событий comment из тела ответа."""
+    return [
+        json.loads(block.split('data: ', 1)[1])
+        for block in content.decode().split('\n\n')
+        if 'event: comment' in block
+    ]
+
+
+@pytest.fixture
+def published(monkeypatch):
+    calls = []
+    monkeypatch.setattr(comment_events, 'publish', calls.append)
+    return calls
+
+
+def test_starts_after_last_comment(client, news_id, comment):
+    """Без Last-Event-ID старые комментарии не приходят."""
+    response = client.get(reverse(settings.URL['events'], args=news_id))
+    assert response['Content-Type'].startswith('text/event-stream')
+    assert 'no-cache' in response['Cache-Control']
+    content = response.content.decode()
+    assert content.startswith(
+        f'retry: {settings.COMMENT_EVENTS_RETRY}\nid: {comment.pk}\n\n'
+    )
+    assert parse_events(response.content) == []
+
+
+def test_resumes_from_last_event_id(client, news_id, comment, author):
+    response = client.get(
+        reverse(settings.URL['events'], args=news_id), HTTP_LAST_EVENT_ID='0'
+    )
+    assert parse_events(response.content) == [{
+        'id': comment.pk,
+        'author': author.username,
+        'text': comment.text,
+        'created': DjangoJSONEncoder().default(comment.created),
+    }]
+
+
+@pytest.mark.parametrize(
+    'args, headers, expected_status',
+    (
+        (pytest.lazy_fixture('news_id'), {'HTTP_LAST_EVENT_ID': 'x'},
+         HTTPStatus.BAD_REQUEST),
+        ((0,), {}, HTTPStatus.NOT_FOUND),
+    ),
+)
+def test_bad_requests(client, args, headers, expected_status):
+    url = reverse(settings.URL['events'], args=args)
+    assert client.get(url, **headers).status_code == expected_status
+
+
+def test_batch_size(settings, news, author):
+    """Соединение читает не больше COMMENT_EVENTS_BATCH_SIZE за раз."""
+    settings.COMMENT_EVENTS_BATCH_SIZE = 2
+    comments = [
+        Comment.objects.create(news=news, author=author, text=f'Текст {i}')
+        for i in range(3)
+    ]
+    batch = comments_after(news.pk, 0)
+    assert batch.full
+    assert batch.last_id == comments[1].pk
+    batch = comments_after(news.pk, batch.last_id)
+    assert not batch.full
+    assert batch.last_id == comments[2].pk
+
+
+def test_comment_published_after_commit(
+        author_client, news_id, form_data, published,
+        django_capture_on_commit_callbacks
+):
+    url = reverse(settings.URL['detail'], args=news_id)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(url, data=form_data)
+    assert published == [list(news_id)]
+
+
+def test_bulk_comments_published(
+        news, published, django_capture_on_commit_callbacks
+):
+    """Пачка из отложенной записи тоже будит подписчиков."""
+    with django_capture_on_commit_callbacks(execute=True):
+        comments_created({news.pk: 2})
+    assert published == [[news.pk]]
+
+
+def test_stream(executor, news, author):
+    """Поток отдаёт новый комментарий и закрывается при отключении."""
+    scope = {
+        'type': 'http',
+        'path': reverse(settings.URL['events'], args=(news.pk,)),
+        'headers': [],
+        'query_string': b'',
+    }
+
+    async def run():
+        sent = asyncio.Queue()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        app = async_views.with_events(None)
+        stream = asyncio.ensure_future(app(scope, receive, sent.put))
+        start = await sent.get()
+        preamble = await sent.get()
+        comment = await async_views.run_db(None, partial(
+            Comment.objects.create, news=news, author=author, text='Новый'
+        ))
+        body = await sent.get()
+        disconnect.set()
+        await asyncio.wait_for(stream, 1)
+        return start, preamble, body, comment
+
+    start, preamble, body, comment = async_to_sync(run)()
+    assert start['status'] == HTTPStatus.OK
+    assert preamble['body'].endswith(b'id: 0\n\n')
+    assert [event['id'] for event in parse_events(body['body'])] == [
+        comment.pk
+    ]
+
+
+def test_other_paths_go_to_django():
+    calls = []
+
+    async def application(scope, receive, send):
+        calls.append(scope['path'])
+
+    app = async_views.with_events(application)
+    async_to_sync(app)({'type': 'http', 'path': '/'}, None, None)
+    assert calls == ['/']
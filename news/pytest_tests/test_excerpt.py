@@ -0,0 +1,48 @@
+"""Тестирование выдержек новостей через pytest."""
+
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.template.defaultfilters import truncatewords
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news.models import News
+from news.seeding import seed
+
+LONG_TEXT = ' '.join(f'слово{index}' for index in range(40))
+
+
+def test_excerpt_matches_truncatewords(news):
+    """Выдержка совпадает с тем, что выводил фильтр truncatewords."""
+    news.text = LONG_TEXT
+    news.save()
+    news.refresh_from_db()
+    assert news.excerpt == truncatewords(LONG_TEXT, 15)
+
+
+def test_home_does_not_read_text(client, news):
+    """Главная выводит выдержку и не читает полный текст."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse(settings.URL['home']))
+    assert news.excerpt in response.content.decode()
+    assert not any(
+        '"news_news"."text"' in query['sql']
+        for query in context.captured_queries
+    )
+
+
+def test_refresh_command(news):
+    News.objects.filter(pk=news.pk).update(excerpt='')
+    call_command('refresh_excerpts', batch_size=1, stdout=StringIO())
+    news.refresh_from_db()
+    assert news.excerpt == news.text
+
+
+def test_fixture_and_seed_get_excerpts():
+    """Загрузка фикстуры и наполнение базы заполняют выдержки."""
+    call_command('loaddata', 'news.json', verbosity=0)
+    seed(5, 1, 0, random_seed=1)
+    assert not News.objects.filter(excerpt='').exists()
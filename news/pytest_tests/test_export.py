@@ -0,0 +1,104 @@
+"""Тестирование потоковой выгрузки через pytest."""
+
+import json
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from news.export import export_lines
+from news.models import Comment, News
+
+
+def parse(lines):
+    return [json.loads(line) for line in lines]
+
+
+def test_export_all_in_batches(news10_in_one_page, comment10_in_one_page_news):
+    """Выгрузка пачками отдаёт каждую запись ровно один раз."""
+    records = parse(export_lines(batch_size=3))
+    news_pks = [r['pk'] for r in records if r['model'] == 'news.news']
+    comment_pks = [r['pk'] for r in records if r['model'] == 'news.comment']
+    assert news_pks == sorted(News.objects.values_list('pk', flat=True))
+    assert comment_pks == sorted(Comment.objects.values_list('pk', flat=True))
+    comment = records[-1]['fields']
+    assert comment['author'] == 'Автор'
+    assert set(comment) == {'news', 'author', 'text', 'created'}
+
+
+def test_export_since_id(comment10_in_one_page_news):
+    """Повторная выгрузка после id отдаёт только новые записи."""
+    last_id = comment10_in_one_page_news[6].pk
+    records = parse(export_lines(
+        models=('comments',), comments_since_id=last_id, batch_size=2
+    ))
+    assert [record['pk'] for record in records] == [
+        comment.pk for comment in comment10_in_one_page_news[7:]
+    ]
+
+
+def test_export_includes_edited_news(news):
+    """Отредактированная старая новость попадает в выгрузку с since."""
+    News.objects.filter(pk=news.pk).update(
+        date=timezone.localdate() - timedelta(days=30)
+    )
+    since = timezone.now()
+    news.refresh_from_db()
+    news.text = 'Исправленный текст'
+    news.save()
+    records = parse(export_lines(models=('news',), since=since))
+    assert [record['pk'] for record in records] == [news.pk]
+
+
+def test_export_since_timestamp(comment10_in_one_page_news):
+    """Выгрузка с момента отдаёт комментарии не старше него."""
+    since = timezone.now() + timedelta(days=5)
+    records = parse(export_lines(models=('comments',), since=since))
+    assert len(records) == len([
+        comment for comment in comment10_in_one_page_news
+        if comment.created >= since
+    ])
+
+
+def test_export_command(comment):
+    """Команда пишет NDJSON в stdout."""
+    out = StringIO()
+    call_command('export_ndjson', batch_size=1, stdout=out)
+    models = [record['model'] for record in parse(out.getvalue().splitlines())]
+    assert models == ['news.news', 'news.comment']
+
+
+def test_export_view_streams_for_staff(author, author_client, comment):
+    """Сотрудник получает потоковый ответ."""
+    author.is_staff = True
+    author.save()
+    response = author_client.get(reverse('news:export'))
+    assert response.streaming
+    assert response['Content-Type'].startswith('application/x-ndjson')
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert len(parse(lines)) == 2
+
+
+@pytest.mark.parametrize(
+    'parametrized_client, expected_status',
+    (
+            (pytest.lazy_fixture('client'), HTTPStatus.FOUND),
+            (pytest.lazy_fixture('author_client'), HTTPStatus.FORBIDDEN),
+    ),
+)
+def test_export_view_closed_for_others(parametrized_client, expected_status):
+    """Гость отправляется на вход, обычный пользователь получает 403."""
+    response = parametrized_client.get(reverse('news:export'))
+    assert response.status_code == expected_status
+
+
+def test_export_view_bad_params(author, author_client):
+    """Испорченные параметры дают 400."""
+    author.is_staff = True
+    author.save()
+    response = author_client.get(reverse('news:export'), {'since': 'вчера'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
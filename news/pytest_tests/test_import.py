@@ -0,0 +1,99 @@
+"""Тестирование быстрой загрузки данных через pytest."""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from news import importing
+from news.export import export_lines
+from news.models import Comment, News
+
+FIXTURE = Path(importing.__file__).parent / 'fixtures' / 'news.json'
+
+
+def test_import_dumpdata_fixture(news):
+    """Фикстура в формате dumpdata загружается потоково."""
+    expected = len(json.loads(FIXTURE.read_text(encoding='utf-8')))
+    call_command('import_news', str(FIXTURE), stdout=io.StringIO())
+    assert News.objects.count() == expected + 1
+
+
+def test_json_array_across_chunks(monkeypatch):
+    """Объекты, разрезанные границей чтения, собираются целиком."""
+    monkeypatch.setattr(importing, 'READ_SIZE', 7)
+    records = [{'model': 'news.news', 'fields': {'title': 'т' * 20}}] * 3
+    text = ' [\n' + ',\n'.join(json.dumps(r) for r in records) + '\n]'
+    assert list(importing.iter_json_array(io.StringIO(text))) == records
+
+
+def test_ndjson_roundtrip(tmp_path, comment10_in_one_page_news, news):
+    """Выгрузка и обратная загрузка сохраняют время, авторов и счётчики."""
+    path = tmp_path / 'dump.ndjson'
+    path.write_text(''.join(export_lines()), encoding='utf-8')
+    expected = list(Comment.objects.values_list(
+        'pk', 'news_id', 'author__username', 'text', 'created'
+    ))
+    News.objects.all().delete()
+    get_user_model().objects.all().delete()
+    call_command(
+        'import_news', str(path), chunk_size=4, batch_size=2,
+        stdout=io.StringIO()
+    )
+    assert list(Comment.objects.values_list(
+        'pk', 'news_id', 'author__username', 'text', 'created'
+    )) == expected
+    assert News.objects.get(pk=news.pk).comment_count == len(expected)
+
+
+def test_import_reuses_existing_authors(tmp_path, author, news):
+    """Существующие пользователи находятся по username, новые создаются."""
+    path = tmp_path / 'comments.ndjson'
+    path.write_text('\n'.join(
+        json.dumps({
+            'model': 'news.comment',
+            'fields': {'news': news.pk, 'author': name, 'text': 'Текст'},
+        })
+        for name in (author.username, 'Новичок', 'Новичок')
+    ), encoding='utf-8')
+    call_command('import_news', str(path), stdout=io.StringIO())
+    assert Comment.objects.filter(author=author).count() == 1
+    assert get_user_model().objects.filter(username='Новичок').exists()
+    news.refresh_from_db()
+    assert news.comment_count == 3
+
+
+def test_ignore_conflicts_counts_inserted_rows(
+        tmp_path, comment10_in_one_page_news, news
+):
+    """Пропущенные записи с занятыми id не считаются загруженными."""
+    path = tmp_path / 'dump.ndjson'
+    path.write_text(''.join(export_lines()), encoding='utf-8')
+    deleted_pk = Comment.objects.order_by('pk').first().pk
+    Comment.objects.filter(pk=deleted_pk).delete()
+    stdout = io.StringIO()
+    call_command(
+        'import_news', str(path), ignore_conflicts=True, batch_size=2,
+        stdout=stdout
+    )
+    assert 'Загружено новостей: 0, комментариев: 1,' in stdout.getvalue()
+    assert Comment.objects.filter(pk=deleted_pk).exists()
+
+
+@pytest.mark.parametrize(
+    'line',
+    (
+            '{"model": "auth.user", "fields": {}}',
+            '{"model": "news.comment", "fields": {"text": "без новости"}}',
+            'не json',
+    )
+)
+def test_bad_record(tmp_path, line):
+    """Некорректные записи прерывают загрузку с понятной ошибкой."""
+    path = tmp_path / 'bad.ndjson'
+    path.write_text(line, encoding='utf-8')
+    with pytest.raises(CommandError):
+        call_command('import_news', str(path), stdout=io.StringIO())
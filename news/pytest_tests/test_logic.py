@@ -1,5 +1,6 @@
 """Тестирование логики через pytest."""
 
+import pytest
 from pytest_django.asserts import assertRedirects, assertFormError
 from django.conf import settings
 from django.urls import reverse
@@ -92,3 +93,44 @@ def test_user_cant_edit_comment_of_another_user(
     assert response.status_code == HTTPStatus.NOT_FOUND
     comment.refresh_from_db()
     assert comment.text == COMMENT_TEXT
+
+
+def news_selects(queries):
+    """Сколько раз запрос читал таблицы новостей и комментариев."""
+    return [
+        query['sql'].split(' FROM ')[1].split()[0]
+        for query in queries
+        if query['sql'].startswith('SELECT') and '"news_' in query['sql']
+    ]
+
+
+def test_create_comment_reads_news_once(
+        author_client, news_id, form_data, django_assert_num_queries
+):
+    """Создание комментария читает новость один раз."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    # Сессия, пользователь, новость, SAVEPOINT, INSERT, счётчик, RELEASE.
+    with django_assert_num_queries(7) as context:
+        author_client.post(url, data=form_data)
+    assert news_selects(context.captured_queries) == ['"news_news"']
+
+
+@pytest.mark.parametrize(
+    'name, method, queries',
+    (
+            # Сессия, пользователь, SAVEPOINT, комментарий, UPDATE,
+            # время изменения новости, RELEASE.
+            ('edit', 'post', 7),
+            # То же, но DELETE и уменьшение счётчика новости.
+            ('delete', 'delete', 7),
+    )
+)
+def test_comment_write_reads_comment_once(
+        author_client, comment_id, form_data, name, method, queries,
+        django_assert_num_queries
+):
+    """Правка и удаление читают только сам комментарий."""
+    url = reverse(settings.URL[name], args=comment_id)
+    with django_assert_num_queries(queries) as context:
+        getattr(author_client, method)(url, data=form_data)
+    assert news_selects(context.captured_queries) == ['"news_comment"']
@@ -0,0 +1,69 @@
+"""Тестирование замеров запросов через pytest."""
+
+import re
+import time
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.template.response import SimpleTemplateResponse
+from django.urls import reverse
+
+from yanews.metrics import registry
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    """Гистограммы копятся в процессе, поэтому очищаем их."""
+    registry.clear()
+
+
+def test_server_timing_header(author_client, news_id):
+    """Ответ содержит общее время, время SQL и шаблона."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    response = author_client.get(url)
+    header = response['Server-Timing']
+    assert re.match(
+        r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+$',
+        header
+    )
+
+
+def test_cache_miss_template_timed(client, news, monkeypatch):
+    """Отрисовку страницы для кеша тоже засекаем."""
+    rendered_content = SimpleTemplateResponse.rendered_content
+
+    @property
+    def slow_rendered_content(response):
+        time.sleep(0.02)
+        return rendered_content.fget(response)
+
+    monkeypatch.setattr(
+        SimpleTemplateResponse, 'rendered_content', slow_rendered_content
+    )
+    response = client.get(reverse(settings.URL['home']))
+    match = re.search(r'tpl;dur=([\d.]+)', response['Server-Timing'])
+    assert float(match[1]) >= 20
+
+
+def test_metrics_endpoint(client, django_assert_num_queries):
+    """Гистограммы отдаются в формате Prometheus по имени представления."""
+    url = reverse(settings.URL['home'])
+    with django_assert_num_queries(1):
+        client.get(url)
+    content = client.get('/metrics').content.decode()
+    assert (
+        'yanews_db_queries_bucket{view="news:home",le="1"} 1' in content
+    )
+    assert 'yanews_request_duration_seconds_count{view="news:home"} 1' in (
+        content
+    )
+    assert 'yanews_template_duration_seconds_sum{view="news:home"}' in (
+        content
+    )
+
+
+def test_metrics_closed_for_outsiders(client):
+    """Снаружи метрики недоступны."""
+    response = client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+    assert response.status_code == HTTPStatus.NOT_FOUND
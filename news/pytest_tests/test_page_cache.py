@@ -0,0 +1,95 @@
+"""Тестирование кеша страниц для анонимных читателей через pytest."""
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+from news.models import Comment, News
+
+PAGES = (
+    ('news:home', None),
+    ('news:detail', pytest.lazy_fixture('news_id')),
+)
+
+
+@pytest.mark.parametrize('name, args', PAGES)
+def test_cache_hit_without_queries(
+        client, name, args, django_assert_num_queries
+):
+    """Повторный просмотр анонимом не обращается к базе."""
+    url = reverse(name, args=args)
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.content == first.content
+
+
+@pytest.mark.parametrize(
+    'name, args, expected',
+    (
+            ('news:home', None, 'Комментариев: 1'),
+            ('news:detail', pytest.lazy_fixture('news_id'), 'Свежий текст'),
+    )
+)
+def test_comment_invalidates_page(
+        client, name, args, expected, news, author
+):
+    """Новый комментарий сбрасывает страницу новости и главную."""
+    url = reverse(name, args=args)
+    client.get(url)
+    Comment.objects.create(news=news, author=author, text='Свежий текст')
+    assert expected in client.get(url).content.decode()
+
+
+def test_other_news_page_stays_cached(
+        client, news, author, django_assert_num_queries
+):
+    """Комментарий к одной новости не сбрасывает страницу другой."""
+    other = News.objects.create(title='Другая', text='Текст')
+    url = reverse(settings.URL['detail'], args=(other.pk,))
+    client.get(url)
+    Comment.objects.create(news=news, author=author, text='Текст')
+    with django_assert_num_queries(0):
+        client.get(url)
+
+
+def test_news_change_invalidates_page(client, news, news_id):
+    """Изменение новости сбрасывает её страницу."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    client.get(url)
+    news.text = 'Исправленный текст'
+    news.save()
+    assert 'Исправленный текст' in client.get(url).content.decode()
+
+
+def test_authorized_client_bypasses_cache(author_client, news_id):
+    """Авторизованный пользователь всегда получает свежую страницу."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    author_client.get(url)
+    response = author_client.get(url)
+    assert 'form' in response.context
+
+
+def test_comments_fragment_shared_between_users(
+        author_client, not_author_client, comment, news_id,
+        django_assert_num_queries
+):
+    """Отрисованные комментарии общие, а ссылки управления — свои."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    edit_url = reverse(settings.URL['edit'], args=(comment.pk,))
+    assert edit_url in author_client.get(url).content.decode()
+    # Сессия, пользователь и новость; комментарии берутся из кеша.
+    with django_assert_num_queries(3):
+        response = not_author_client.get(url)
+    content = response.content.decode()
+    assert comment.text in content
+    assert edit_url not in content
+
+
+def test_comment_edit_invalidates_fragment(author_client, comment, news_id):
+    """Правка комментария сбрасывает закешированный фрагмент."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    author_client.get(url)
+    comment.text = 'Исправленный комментарий'
+    comment.save()
+    assert comment.text in author_client.get(url).content.decode()
@@ -0,0 +1,87 @@
+"""Тестирование постраничного вывода по курсору через pytest."""
+
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from news.models import Comment, News
+
+PER_PAGE = 3
+
+
+@pytest.fixture
+def many_comments(author, news, settings):
+    """Семь комментариев, у части из них одинаковое время создания."""
+    settings.COMMENTS_COUNT_ON_PAGE = PER_PAGE
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(7)
+    )
+    Comment.objects.update(created=timezone.now())
+    return list(Comment.objects.order_by('created', 'id'))
+
+
+def test_detail_shows_first_page(client, news_id, many_comments):
+    """На странице новости только первая страница комментариев."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    response = client.get(url)
+    page = response.context['comments']
+    assert [comment.pk for comment in page.object_list] == [
+        comment.pk for comment in many_comments[:PER_PAGE]
+    ]
+    assert page.next_cursor
+
+
+def test_fragments_walk_all_comments(client, news_id, many_comments):
+    """Фрагменты по курсору выдают все комментарии без повторов."""
+    url = reverse(settings.URL['comments'], args=news_id)
+    seen = []
+    cursor = ''
+    while True:
+        response = client.get(url, {'cursor': cursor})
+        page = response.context['comments']
+        seen.extend(comment.pk for comment in page.object_list)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert seen == [comment.pk for comment in many_comments]
+
+
+def test_fragment_query_count(
+        client, news_id, many_comments, django_assert_num_queries
+):
+    """Страница комментариев стоит один запрос."""
+    url = reverse(settings.URL['comments'], args=news_id)
+    first = client.get(url).context['comments']
+    with django_assert_num_queries(1):
+        client.get(url, {'cursor': first.next_cursor})
+
+
+@pytest.mark.parametrize('cursor', ('мусор', 'WzFd', 'e30'))
+def test_bad_cursor(client, news_id, cursor):
+    """Испорченный курсор даёт 400."""
+    url = reverse(settings.URL['comments'], args=news_id)
+    response = client.get(url, {'cursor': cursor})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_archive_walks_all_news(
+        client, news10_in_one_page, settings, django_assert_num_queries
+):
+    """Архив по курсору выдаёт все новости по убыванию даты без COUNT."""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = PER_PAGE
+    expected = list(News.objects.order_by('-date', '-id'))
+    url = reverse(settings.URL['archive'])
+    seen = []
+    cursor = ''
+    while True:
+        with django_assert_num_queries(1):
+            response = client.get(url, {'cursor': cursor})
+        seen.extend(response.context['object_list'])
+        cursor = response.context['next_cursor']
+        if not cursor:
+            break
+    assert seen == expected
@@ -0,0 +1,54 @@
+"""Тестирование фильтра запрещённых слов через pytest."""
+
+import os
+
+import pytest
+
+from news.forms import WARNING, CommentForm
+from news.profanity import WordMatcher, get_matcher
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    (
+            ('Ну ты и Негодяй!', True),
+            ('редиски на грядке', True),
+            ('Обычный текст', False),
+            ('a.b', False),
+            ('a+b', True),
+            ('', False),
+    )
+)
+def test_matcher(text, expected):
+    """Автомат находит слова без учёта регистра и спецсимволов."""
+    matcher = WordMatcher(('негодяй', 'редиск', 'a+b', 'нег'))
+    assert matcher.search(text) is expected
+
+
+def test_empty_matcher():
+    """Пустой список ничего не запрещает."""
+    assert WordMatcher(()).search('что угодно') is False
+
+
+def test_word_list_hot_reload(tmp_path, settings):
+    """Изменение файла со словами подхватывается без перезапуска."""
+    path = tmp_path / 'words.txt'
+    path.write_text('# комментарий\nбука\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = path
+    assert get_matcher().search('Бука!')
+    assert not get_matcher().search('бяка')
+    path.write_text('бяка\n', encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert get_matcher().search('бяка')
+    assert not get_matcher().search('бука')
+
+
+def test_form_uses_word_file(tmp_path, settings):
+    """Форма комментария проверяет слова из файла."""
+    path = tmp_path / 'words.txt'
+    path.write_text('бяка\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = path
+    form = CommentForm(data={'text': 'Какая-то БЯКА'})
+    assert not form.is_valid()
+    assert form.errors['text'] == [WARNING]
@@ -0,0 +1,62 @@
+"""Проверка бюджета SQL-запросов страниц через pytest."""
+
+import pytest
+from django.test.client import Client
+
+from news.models import Comment
+from news.seeding import seed
+
+SIZES = (
+    (5, 2, 20),
+    (20, 5, 500),
+    (50, 10, 3000),
+)
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f'{size[2]}-comments')
+def seeded(request, settings):
+    """Наполненная база разного размера и её самый обсуждаемый сюжет."""
+    settings.COMMENTS_COUNT_ON_PAGE = 10
+    news_ids, _ = seed(*request.param, random_seed=1)
+    hot_news_id = news_ids[0]
+    comment = Comment.objects.filter(news_id=hot_news_id).last()
+    client = Client()
+    client.force_login(comment.author)
+    return hot_news_id, comment.pk, client
+
+
+def pages(news_id, comment_id):
+    return (
+        ('news:home', None),
+        ('news:archive', None),
+        ('news:detail', (news_id,)),
+        ('news:comments', (news_id,)),
+        ('news:edit', (comment_id,)),
+        ('news:delete', (comment_id,)),
+    )
+
+
+def test_pages_within_budget(seeded, client, assert_query_budget):
+    """Страницы укладываются в бюджет анонимно и после входа."""
+    news_id, comment_id, author_client = seeded
+    for name, args in pages(news_id, comment_id):
+        assert_query_budget(author_client, name, args)
+        if name not in ('news:edit', 'news:delete'):
+            assert_query_budget(client, name, args)
+
+
+def test_detail_queries_do_not_grow_with_comments(
+        settings, author, author_client, news, assert_query_budget
+):
+    """Число запросов страницы новости не зависит от числа комментариев."""
+    settings.COMMENTS_COUNT_ON_PAGE = 10
+    counts = []
+    for total in (1, 10, 200):
+        Comment.objects.bulk_create(
+            Comment(news=news, author=author, text=f'Текст {index}')
+            for index in range(total - Comment.objects.count())
+        )
+        counts.append(
+            assert_query_budget(author_client, 'news:detail', (news.pk,))
+        )
+    assert len(set(counts)) == 1
@@ -0,0 +1,152 @@
+"""Проверка планов запросов страниц через pytest."""
+
+import re
+from contextlib import contextmanager
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from news.models import Comment, News
+from news.pagination import KeysetPaginator
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN есть в SQLite'
+)
+
+SCAN = re.compile(r'^SCAN ')
+INDEX_SCAN = re.compile(r'^SCAN \w+ USING (COVERING )?INDEX ')
+LIMIT = re.compile(r'\bLIMIT\b')
+SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@contextmanager
+def capture_statements():
+    """
+    SELECT страницы вместе с параметрами.
+
+    В captured_queries параметры подставлены в текст, а с константами
+    SQLite строит другой план, чем для запроса с параметрами.
+    """
+    statements = []
+
+    def execute(execute, sql, params, many, context):
+        if sql.startswith('SELECT'):
+            statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(execute):
+        yield statements
+
+
+def query_plans(statements):
+    """Шаги планов запросов."""
+    plans = []
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plans.extend(detail for *_, detail in cursor.fetchall())
+    return plans
+
+
+def full_scans(statements):
+    """
+    Собираем шаги планов, читающие или сортирующие таблицу целиком.
+
+    Ограниченным считаем только обход индекса в порядке сортировки
+    запроса с LIMIT: он останавливается на размере страницы. Любой
+    другой SCAN, в том числе по индексу, читает всё.
+    """
+    scans = []
+    for sql, params in statements:
+        plan = query_plans([(sql, params)])
+        bounded = LIMIT.search(sql) and SORT not in plan
+        scans.extend(
+            (step, sql) for step in plan
+            if step == SORT or SCAN.match(step) and not (
+                bounded and INDEX_SCAN.match(step)
+            )
+        )
+    return scans
+
+
+@pytest.mark.parametrize(
+    'name, args',
+    (
+            ('news:home', None),
+            ('news:archive', None),
+            ('news:detail', pytest.lazy_fixture('news_id')),
+            ('news:comments', pytest.lazy_fixture('news_id')),
+            ('news:edit', pytest.lazy_fixture('comment_id')),
+            ('news:delete', pytest.lazy_fixture('comment_id')),
+    )
+)
+def test_views_use_indexes(author_client, name, args, comment):
+    """Ни один запрос страницы не сканирует таблицу целиком."""
+    url = reverse(name, args=args)
+    with capture_statements() as statements:
+        author_client.get(url)
+    assert full_scans(statements) == []
+
+
+@pytest.mark.parametrize(
+    'name, seek',
+    (
+            ('news:archive', 'date<?'),
+            ('news:comments', 'news_id=? AND created>?'),
+    )
+)
+def test_cursor_pages_use_indexes(client, name, seek, news, author, settings):
+    """Страница после курсора ищет начало по колонке сортировки."""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 2
+    settings.COMMENTS_COUNT_ON_PAGE = 2
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст') for index in range(200)
+    )
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(200)
+    )
+    url = reverse(name, args=(news.id,) if name == 'news:comments' else None)
+    first = client.get(url).context
+    cursor = first.get('next_cursor') or first['comments'].next_cursor
+    with capture_statements() as statements:
+        client.get(url, {'cursor': cursor})
+    assert full_scans(statements) == []
+    assert any(seek in step for step in query_plans(statements))
+
+
+def test_deep_comment_cursor_seeks(client, news, author, settings):
+    """Глубокая страница комментариев начинается с поиска по индексу."""
+    settings.COMMENTS_COUNT_ON_PAGE = 2
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(50)
+    )
+    last = Comment.objects.order_by('created', 'id')[45]
+    cursor = KeysetPaginator(('created', 'id'), 2).encode(last)
+    url = reverse('news:comments', args=(news.id,))
+    with capture_statements() as statements:
+        page = client.get(url, {'cursor': cursor}).context['comments']
+    assert len(page.object_list) == 2
+    assert any(
+        'news_id=? AND created>?' in step for step in query_plans(statements)
+    )
+
+
+@pytest.mark.parametrize('name', ('news:archive', 'news:api_news_list'))
+def test_deep_news_cursor_seeks(client, name, news10_in_one_page, settings):
+    """Глубокая страница архива и API начинается с поиска по дате."""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 2
+    last = News.objects.order_by('-date', '-id')[7]
+    cursor = KeysetPaginator(('-date', '-id'), 2).encode(last)
+    with capture_statements() as statements:
+        response = client.get(reverse(name), {'cursor': cursor})
+    assert response.status_code == HTTPStatus.OK
+    plans = query_plans(statements)
+    assert (
+        'SEARCH news_news USING INDEX news_date_id_idx (date<?)' in plans
+    )
+    # Страница идёт по индексу в нужном порядке, без сортировки.
+    assert SORT not in plans
@@ -0,0 +1,190 @@
+"""Тестирование чтения с реплик через pytest."""
+
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from news import async_views
+from news.models import News
+from yanews.replicas import (STICKY_COOKIE, StickyPrimaryMiddleware,
+                             read_from_primary)
+
+
+@pytest.fixture
+def replicas(settings, monkeypatch, transactional_db, tmp_path):
+    """
+    Реплика — отдельный файл SQLite, который не догоняет основную базу.
+
+    Схема накатывается без роутера: на реплики он миграции не пускает.
+    Тест без обёртки в транзакцию: в ней чтение идёт в default.
+    """
+    monkeypatch.setitem(connections.settings, 'replica', {
+        **connections.settings[DEFAULT_DB_ALIAS],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    })
+    # Без роутера права и типы содержимого реплики пишутся в неё же.
+    with override_settings(DATABASE_ROUTERS=[]):
+        call_command('migrate', database='replica', verbosity=0)
+    ContentType.objects.clear_cache()
+    settings.DATABASE_REPLICAS = ['replica']
+    yield
+    connections['replica'].close()
+    del connections['replica']
+
+
+def news_exists(request):
+    """Отвечаем, видна ли новость из запроса."""
+    exists = News.objects.filter(pk=request.GET['pk']).exists()
+    return HttpResponse(str(exists))
+
+
+def add_news(request):
+    return HttpResponse(News.objects.create(title='Новость', text='Текст').pk)
+
+
+def read_database(request):
+    """Отвечаем псевдонимом базы, из которой читались бы новости."""
+    return HttpResponse(router.db_for_read(News))
+
+
+def call(request):
+    return StickyPrimaryMiddleware(read_database)(request)
+
+
+def test_reads_from_replica_writes_to_primary(replicas):
+    assert router.db_for_read(News) == 'replica'
+    assert router.db_for_write(News) == 'default'
+
+
+def test_reads_in_transaction_from_primary(replicas):
+    """Внутри транзакции читаем то, что только что записали."""
+    with transaction.atomic():
+        assert router.db_for_read(News) == 'default'
+
+
+def test_write_request_sticks_to_primary(replicas):
+    """Запрос с записью читает из основной базы и ставит cookie."""
+    response = call(RequestFactory().post('/'))
+    assert response.content == b'default'
+    assert response.cookies[STICKY_COOKIE]['max-age'] == (
+        settings.PRIMARY_STICKY_SECONDS
+    )
+
+
+@pytest.mark.parametrize(
+    'cookie, expected',
+    (
+            (None, b'replica'),
+            (str(time.time() + 60), b'default'),
+            (str(time.time() - 1), b'replica'),
+            ('мусор', b'replica'),
+    )
+)
+def test_sticky_cookie(replicas, cookie, expected):
+    """Чтение возвращается на реплику, когда окно после записи истекло."""
+    factory = RequestFactory()
+    if cookie is not None:
+        factory.cookies[STICKY_COOKIE] = cookie
+    response = call(factory.get('/'))
+    assert response.content == expected
+    assert STICKY_COOKIE not in response.cookies
+
+
+def test_replica_lags_behind_sticky_reads(replicas):
+    """Запись сразу видна в окне после неё и не видна с реплики."""
+    factory = RequestFactory()
+    response = StickyPrimaryMiddleware(add_news)(factory.post('/'))
+    pk = response.content.decode()
+    factory.cookies[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+    sticky = StickyPrimaryMiddleware(news_exists)(factory.get('/', {'pk': pk}))
+    assert sticky.content == b'True'
+    other = StickyPrimaryMiddleware(news_exists)(
+        RequestFactory().get('/', {'pk': pk})
+    )
+    assert other.content == b'False'
+
+
+def test_comment_post_sets_sticky_cookie(author_client, news_id, form_data):
+    """После комментария автор читает из основной базы."""
+    url = reverse(settings.URL['detail'], args=news_id)
+    response = author_client.post(url, data=form_data)
+    assert STICKY_COOKIE in response.cookies
+
+
+def test_author_streams_own_comment(replicas, author_client, news, form_data):
+    """Ветка после комментария читается из основной базы, как и её конец."""
+    url = reverse(settings.URL['detail'], args=(news.pk,))
+    author_client.post(url, data=form_data)
+    response = author_client.get(url, {'comments': 'all'})
+    content = b''.join(response.streaming_content).decode()
+    assert form_data['text'] in content
+
+
+def test_author_streams_own_comment_under_asgi(
+        replicas, executor, author_client, news, form_data
+):
+    """Под ASGI ветку перебирает поток пула, и он тоже читает из default."""
+    url = reverse(settings.URL['detail'], args=(news.pk,))
+    author_client.post(url, data=form_data)
+    cookies = '; '.join(
+        f'{name}={morsel.value}'
+        for name, morsel in author_client.cookies.items()
+    )
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': url,
+        'query_string': b'comments=all',
+        'headers': [
+            (b'host', b'testserver'), (b'cookie', cookies.encode()),
+        ],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(async_views.StreamingASGIHandler())(scope, receive, send)
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+    assert form_data['text'] in content.decode()
+
+
+def test_read_from_primary(replicas):
+    with read_from_primary():
+        assert router.db_for_read(News) == 'default'
+    assert router.db_for_read(News) == 'replica'
+
+
+@pytest.mark.parametrize('name', ('home', 'detail'))
+def test_cached_pages_rendered_from_primary(
+        replicas, monkeypatch, client, news, name
+):
+    """Страница для кеша не читается с отстающей реплики."""
+    reads = []
+
+    def db_for_read(self, model, **hints):
+        database = original(self, model, **hints)
+        reads.append(database)
+        return database
+
+    original = type(router.routers[0]).db_for_read
+    monkeypatch.setattr(type(router.routers[0]), 'db_for_read', db_for_read)
+    args = (news.pk,) if name == 'detail' else ()
+    client.get(reverse(settings.URL[name], args=args))
+    assert reads
+    assert set(reads) == {'default'}
+
+
+def test_async_news_loaded_from_primary(replicas, news):
+    assert async_views.load_news(news.pk)._state.db == 'default'
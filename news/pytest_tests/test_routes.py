@@ -10,7 +10,10 @@ from django.urls import reverse
     'name, args',
     (
             ('news:home', None),
+            ('news:archive', None),
+            ('news:search', None),
             ('news:detail', pytest.lazy_fixture('news_id')),
+            ('news:events', pytest.lazy_fixture('news_id')),
             ('users:login', None),
             ('users:logout', None),
             ('users:signup', None),
@@ -0,0 +1,144 @@
+"""Тестирование полнотекстового поиска через pytest."""
+
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+
+from news.models import Comment, News
+from news.search import TABLE, search
+
+
+@pytest.fixture
+def robots():
+    """Новости о роботах: в заголовке, в тексте и в обоих местах."""
+    return [
+        News.objects.create(title='Робот открыл мост', text='Робот, мост.'),
+        News.objects.create(title='Погода', text='Робот видел дождь.'),
+        News.objects.create(title='Робот в школе', text='Школа.'),
+    ]
+
+
+def test_ranked_by_title_weight(robots):
+    """Совпадение в заголовке важнее совпадения в тексте."""
+    results = search('робот', per_page=10).object_list
+    assert len(results) == len(robots)
+    assert results[-1].pk == robots[1].pk
+
+
+def test_cursor_walks_all_results(robots):
+    seen = []
+    cursor = None
+    while True:
+        page = search('робот', per_page=1, cursor=cursor)
+        seen.extend(result.pk for result in page.object_list)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert seen == [
+        result.pk for result in search('робот', per_page=10).object_list
+    ]
+
+
+def test_only_newest_matches_ranked(robots, settings):
+    """Частое слово ранжирует только SEARCH_CANDIDATES новых совпадений."""
+    settings.SEARCH_CANDIDATES = 2
+    page = search('робот', per_page=10)
+    results = page.object_list
+    assert [result.pk for result in results] == [robots[2].pk, robots[1].pk]
+    assert page.capped
+    page = search('робот', per_page=1)
+    assert page.capped
+    assert search(
+        'робот', per_page=10, cursor=page.next_cursor
+    ).object_list == results[1:]
+
+
+@pytest.mark.parametrize('candidates, capped', ((2, True), (3, False)))
+def test_cap_shown_on_page(client, robots, settings, candidates, capped):
+    """Страница предупреждает, что старые совпадения не ранжировались."""
+    settings.SEARCH_CANDIDATES = candidates
+    response = client.get(reverse('news:search'), {'q': 'робот'})
+    assert response.context['capped'] is capped
+    notice = f'Результаты выбраны из {candidates} самых новых совпадений.'
+    assert (notice in response.content.decode()) is capped
+
+
+def test_snippet_escapes_text(news):
+    """Текст новости экранируется, выделение совпадений — нет."""
+    news.text = 'Робот <script>alert(1)</script> уехал.'
+    news.save()
+    snippet = search('робот', per_page=1).object_list[0].snippet
+    assert '<mark>Робот</mark>' in snippet
+    assert '<script>' not in snippet
+
+
+@pytest.mark.parametrize('query', ('"', 'AND OR (', 'title:робот*', ''))
+def test_operators_in_query_are_ignored(query):
+    """Синтаксис FTS5 во вводе пользователя не ломает запрос."""
+    assert search(query, per_page=10).object_list == []
+
+
+def test_index_follows_changes(news):
+    """Триггеры обновляют индекс при изменении и удалении новости."""
+    news.title = 'Необычайное событие'
+    news.save()
+    assert search('необычайное', per_page=10).object_list
+    assert not search('заголовок', per_page=10).object_list
+    news.delete()
+    assert not search('необычайное', per_page=10).object_list
+
+
+def clear_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('delete-all')")
+
+
+def test_counter_update_does_not_touch_index(news, author):
+    """Комментарий меняет счётчик новости, но не переписывает индекс."""
+    clear_index()
+    Comment.objects.create(news=news, author=author, text='Текст')
+    assert not search('заголовок', per_page=10).object_list
+
+
+def test_bulk_created_news_are_found():
+    News.objects.bulk_create([News(title='Пакетная', text='Вставка')])
+    assert search('пакетная', per_page=10).object_list
+
+
+def test_rebuild_command(news):
+    clear_index()
+    assert not search('заголовок', per_page=10).object_list
+    call_command('rebuild_search_index', stdout=StringIO())
+    assert search('заголовок', per_page=10).object_list
+
+
+def test_search_page(client, robots, settings):
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 2
+    response = client.get(reverse('news:search'), {'q': 'робот'})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.context['object_list']) == 2
+    assert response.context['next_cursor']
+    assert '<mark>Робот</mark>' in response.content.decode()
+
+
+def test_search_page_bad_cursor(client):
+    response = client.get(
+        reverse('news:search'), {'q': 'робот', 'cursor': 'мусор'}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_triggers_survive_migrations():
+    """Миграции, пересоздающие news_news, возвращают триггеры индекса."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'news_news'"
+        )
+        assert {name for name, in cursor.fetchall()} == {
+            f'{TABLE}_insert', f'{TABLE}_delete', f'{TABLE}_update'
+        }
@@ -0,0 +1,37 @@
+"""Тестирование генератора данных через pytest."""
+
+from django.core.management import call_command
+from django.db.models import Count
+
+from news.models import Comment, News
+from news.seeding import seed
+
+
+def test_seed_creates_consistent_data():
+    """Счётчики комментариев совпадают с таблицей комментариев."""
+    news_ids, user_ids = seed(20, 5, 300, random_seed=1)
+    assert len(news_ids) == 20
+    assert len(user_ids) == 5
+    assert Comment.objects.filter(news_id__in=news_ids).count() == 300
+    actual = dict(
+        Comment.objects.order_by().values_list('news').annotate(
+            total=Count('pk')
+        )
+    )
+    for news in News.objects.filter(pk__in=news_ids):
+        assert news.comment_count == actual.get(news.pk, 0)
+
+
+def test_seed_is_skewed():
+    """Первую по рангу новость обсуждают больше всего."""
+    news_ids, _ = seed(50, 5, 1000, random_seed=1)
+    counts = dict(News.objects.values_list('pk', 'comment_count'))
+    assert counts[news_ids[0]] == max(counts.values())
+    assert counts[news_ids[0]] > 1000 / 50 * 5
+
+
+def test_seed_command(capsys):
+    """Команда создаёт запрошенное количество записей."""
+    call_command('seed_news', news=3, users=2, comments=10, seed=1)
+    assert Comment.objects.count() == 10
+    assert 'комментариев: 10' in capsys.readouterr().out
@@ -0,0 +1,79 @@
+"""Тестирование потоковой страницы новости через pytest."""
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+from news.models import Comment
+
+
+@pytest.fixture
+def url(news_id):
+    return reverse(settings.URL['detail'], args=news_id) + '?comments=all'
+
+
+@pytest.fixture
+def comments(news, author, settings):
+    settings.COMMENTS_STREAM_CHUNK_SIZE = 2
+    return [
+        Comment.objects.create(
+            news=news, author=author, text=f'Комментарий {index}'
+        )
+        for index in range(5)
+    ]
+
+
+def test_all_comments_streamed(client, url, news, comments):
+    """Шапка и новость приходят первой частью, затем все комментарии."""
+    response = client.get(url)
+    assert response.streaming
+    chunks = [chunk.decode() for chunk in response.streaming_content]
+    assert news.title in chunks[0]
+    assert 'Комментарий' not in chunks[0]
+    # Шапка, три пачки, последняя — вместе с концом страницы.
+    assert len(chunks) == 4
+    content = ''.join(chunks)
+    positions = [content.index(comment.text) for comment in comments]
+    assert positions == sorted(positions)
+    assert 'class="load-more"' not in content
+    assert f'?after={comments[-1].pk}' in content
+
+
+def test_author_sees_edit_links(author_client, url, comments):
+    content = b''.join(author_client.get(url).streaming_content).decode()
+    for comment in comments:
+        assert reverse(settings.URL['edit'], args=(comment.pk,)) in content
+
+
+def test_queries_do_not_depend_on_thread_length(
+        client, url, news, author, comments, django_assert_num_queries
+):
+    """Комментарии читаются одним курсором при любой длине ветки."""
+    with django_assert_num_queries(3):
+        b''.join(client.get(url).streaming_content)
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text='Ещё текст') for _ in range(20)
+    )
+    with django_assert_num_queries(3):
+        b''.join(client.get(url).streaming_content)
+
+
+def test_without_comments_page_is_not_streamed(client, url):
+    response = client.get(url)
+    assert not response.streaming
+    assert 'Здесь никто ничего не написал' in response.content.decode()
+
+
+def test_long_thread_links_to_streaming_page(
+        client, news_id, news, author, settings
+):
+    """На первой странице длинной ветки есть ссылка на всю ветку."""
+    settings.COMMENTS_COUNT_ON_PAGE = 2
+    for index in range(3):
+        Comment.objects.create(news=news, author=author, text=f'Текст {index}')
+    content = client.get(
+        reverse(settings.URL['detail'], args=news_id)
+    ).content.decode()
+    assert '?comments=all' in content
+    # Пока ветка не выведена целиком, новые комментарии не дописываются.
+    assert 'EventSource' not in content
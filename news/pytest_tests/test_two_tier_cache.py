@@ -0,0 +1,143 @@
+"""Тестирование двухуровневого кеша страниц через pytest."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.urls import reverse
+
+from news import cache as page_cache
+from news.cache import InvalidationChannel, LocalCache
+from news.models import Comment
+
+
+@pytest.fixture
+def channel(monkeypatch, tmp_path):
+    """Канал в отдельном файле, чтобы не мешать другим процессам."""
+    channel = InvalidationChannel(tmp_path / 'channel.log')
+    monkeypatch.setattr(page_cache, 'channel', channel)
+    return channel
+
+
+@pytest.fixture
+def shared_gets(monkeypatch):
+    """Считаем обращения к общему кешу."""
+    calls = []
+    get = cache.get
+
+    def counting_get(key, *args, **kwargs):
+        calls.append(key)
+        return get(key, *args, **kwargs)
+
+    monkeypatch.setattr(cache, 'get', counting_get)
+    return calls
+
+
+def test_lru_evicts_oldest():
+    local = LocalCache(max_entries=2, timeout=60)
+    local.set('a', 1)
+    local.set('b', 2)
+    local.get('a')
+    local.set('c', 3)
+    assert (local.get('a'), local.get('b'), local.get('c')) == (1, None, 3)
+
+
+def test_entries_expire():
+    local = LocalCache(max_entries=2, timeout=-1)
+    local.set('a', 1)
+    assert local.get('a') is None
+
+
+def test_hot_page_served_from_memory(client, channel, shared_gets):
+    """Повторный просмотр не обращается даже к общему кешу."""
+    url = reverse(settings.URL['home'])
+    client.get(url)
+    shared_gets.clear()
+    client.get(url)
+    assert shared_gets == []
+
+
+def test_other_process_invalidation(channel):
+    """Сброс в другом процессе доходит через канал."""
+    key = page_cache.home_page_key()
+    version = page_cache.get_version(key)
+    # Другой процесс: своя позиция в том же файле.
+    other = InvalidationChannel(channel.path)
+    cache.incr(page_cache.version_key(key))
+    assert page_cache.get_version(key) == version
+    other.publish([key])
+    assert page_cache.get_version(key) == version + 1
+
+
+def test_invalidation_from_other_process(channel):
+    """Настоящий другой процесс: новая версия берётся из общего кеша."""
+    key = page_cache.home_page_key()
+    version = page_cache.get_version(key)
+    database = str(connection.settings_dict['NAME'])
+    subprocess.run(
+        [
+            sys.executable, '-c',
+            'import django; django.setup(); '
+            'from django.db import connection; '
+            f'connection.settings_dict["NAME"] = {database!r}; '
+            'from news import cache; '
+            'cache.channel = cache.InvalidationChannel('
+            f'{str(channel.path)!r}); '
+            f'cache.bump_versions([{key!r}])',
+        ],
+        check=True,
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'yanews.settings',
+            'YANEWS_CACHE_DIR': str(settings.CACHE_DIR),
+        },
+        cwd=settings.BASE_DIR,
+    )
+    assert page_cache.get_version(key) != version
+
+
+def test_keys_depend_on_database(monkeypatch):
+    """Тесты и сайт с одним файловым кешем не видят страниц друг друга."""
+    key = cache.make_key('page:home')
+    monkeypatch.setitem(connection.settings_dict, 'NAME', 'other.sqlite3')
+    assert cache.make_key('page:home') != key
+
+
+def test_process_local_cache_rejected(settings):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    with pytest.raises(ImproperlyConfigured):
+        page_cache.check_shared_cache()
+
+
+def test_comment_is_visible_at_once(client, channel, news, author):
+    """После нового комментария страница из памяти не отдаётся."""
+    url = reverse(settings.URL['detail'], args=(news.pk,))
+    client.get(url)
+    Comment.objects.create(news=news, author=author, text='Свежий текст')
+    assert 'Свежий текст' in client.get(url).content.decode()
+
+
+def test_restarted_channel_clears_memory(channel):
+    """Если файл канала начат заново, версии в памяти сбрасываются."""
+    key = page_cache.home_page_key()
+    channel.publish(['x' * 10])
+    page_cache.get_version(key)
+    open(channel.path, 'w').close()
+    page_cache.sync_local()
+    assert page_cache.local_cache.get(page_cache.version_key(key)) is None
+
+
+def test_partial_line_is_read_later(channel):
+    with open(channel.path, 'a') as file:
+        file.write('page:home\npage:det')
+    assert channel.poll() == ['page:home']
+    with open(channel.path, 'a') as file:
+        file.write('ail:1\n')
+    assert channel.poll() == ['page:detail:1']
@@ -0,0 +1,112 @@
+"""Тестирование отложенной записи комментариев через pytest."""
+
+import queue
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+from news.models import Comment, News
+from news.write_behind import (CommentQueueFull, CommentWriter, QueuedComment,
+                               comment_writer)
+
+
+@pytest.fixture
+def write_behind(settings):
+    settings.COMMENT_WRITE_BEHIND = True
+    yield comment_writer
+    comment_writer.stop()
+
+
+def test_batch_updates_counters_and_pages(client, news, author):
+    """Пачка обновляет счётчик и сбрасывает страницы, как сигналы."""
+    url = reverse(settings.URL['home'])
+    client.get(url)
+    batch = [
+        QueuedComment(Comment(news=news, author=author, text=f'Текст {i}'))
+        for i in range(3)
+    ]
+    CommentWriter().write(batch)
+    assert all(item.done.is_set() and not item.error for item in batch)
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.count() == 3
+    assert 'Комментариев: 3' in client.get(url).content.decode()
+
+
+def test_bad_comment_does_not_fail_batch(transactional_db, news, author):
+    """Ошибочный комментарий получает ошибку, остальные записываются."""
+    good = QueuedComment(Comment(news=news, author=author, text='Текст'))
+    bad = QueuedComment(Comment(news_id=0, author=author, text='Текст'))
+    CommentWriter().write([good, bad])
+    assert good.error is None
+    assert bad.error is not None
+    assert list(Comment.objects.values_list('news_id', flat=True)) == [
+        news.pk
+    ]
+
+
+def test_full_queue_rejects(monkeypatch, news, author):
+    writer = CommentWriter()
+    monkeypatch.setattr(writer, 'start', lambda: None)
+    writer.queue = queue.Queue(1)
+    writer.queue.put(object())
+    with pytest.raises(CommentQueueFull):
+        writer.submit(Comment(news=news, author=author, text='Текст'))
+
+
+def test_full_queue_answers_503(
+        monkeypatch, write_behind, author_client, news_id, form_data
+):
+    def submit(comment):
+        raise CommentQueueFull
+
+    monkeypatch.setattr(write_behind, 'submit', submit)
+    url = reverse(settings.URL['detail'], args=news_id)
+    response = author_client.post(url, data=form_data)
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response['Retry-After']
+
+
+def test_author_sees_comment_after_redirect(
+        transactional_db, write_behind, author_client, news, form_data
+):
+    """Запрос ждёт записи своей пачки, поэтому комментарий уже в базе."""
+    url = reverse(settings.URL['detail'], args=(news.pk,))
+    for index in range(3):
+        text = f'{form_data["text"]} {index}'
+        response = author_client.post(url, data={'text': text}, follow=True)
+        assert text in response.content.decode()
+    write_behind.stop()
+    assert News.objects.get(pk=news.pk).comment_count == 3
+
+
+def test_other_errors_reach_requests(
+        transactional_db, monkeypatch, write_behind, news, author
+):
+    """Ошибка кеша достаётся запросу, а поток продолжает писать."""
+    def fail(counts):
+        raise OSError('Кеш недоступен.')
+
+    monkeypatch.setattr('news.write_behind.comments_created', fail)
+    with pytest.raises(OSError):
+        write_behind.submit(Comment(news=news, author=author, text='Текст'))
+    monkeypatch.undo()
+    write_behind.submit(Comment(news=news, author=author, text='Текст'))
+    assert write_behind.thread.is_alive()
+    assert Comment.objects.count() == 1
+
+
+def test_restart_keeps_queue(transactional_db, news, author):
+    """Перезапущенный поток пишет комментарии, ждавшие в очереди."""
+    writer = CommentWriter()
+    writer.queue = queue.Queue()
+    item = QueuedComment(Comment(news=news, author=author, text='Текст'))
+    writer.queue.put(item)
+    writer.start()
+    try:
+        assert item.done.wait(5)
+    finally:
+        writer.stop()
+    assert item.error is None
+    assert Comment.objects.count() == 1
@@ -0,0 +1,181 @@
+"""
+Полнотекстовый поиск по новостям.
+
+Индекс — таблица SQLite FTS5 news_news_fts (см. миграцию 0006), её
+держат в актуальном состоянии триггеры на news_news, поэтому он
+обновляется и при bulk_create. На SQLite Django пересоздаёт таблицу
+при изменении схемы News, и триггеры пропадают вместе с ней: миграция,
+которая меняет News, должна создать их заново (см. 0007), а команда
+rebuild_search_index создаёт недостающие. Результаты упорядочены по bm25, где
+заголовок весит больше текста; следующая страница начинается после
+(ранг, id) последнего результата, как в KeysetPaginator.
+
+Частое слово совпадает с большой долей новостей, и сортировка по рангу
+считала бы bm25 для каждой из них. Поэтому ранжируются только
+SEARCH_CANDIDATES самых новых совпадений: индекс отдаёт их в порядке
+rowid без подсчёта ранга. Если совпадений больше, страница об этом
+сообщает: более старые новости в выдачу не попадают. Выделение и
+фрагмент текста строятся только для строк страницы.
+"""
+
+import base64
+import binascii
+import json
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db import connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News
+from .pagination import Page
+
+TABLE = 'news_news_fts'
+# Управляющие символы не встречаются в тексте новостей, поэтому границы
+# совпадений можно найти уже после экранирования HTML.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 24
+WORD = re.compile(r'\w+')
+
+TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON news_news
+    BEGIN
+        INSERT INTO {TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON news_news
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF title, text ON news_news BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+)
+
+SearchResult = namedtuple(
+    'SearchResult', ('pk', 'title', 'date', 'snippet', 'rank')
+)
+# capped — совпадений больше SEARCH_CANDIDATES, ранжированы не все.
+SearchPage = namedtuple('SearchPage', Page._fields + ('capped',))
+
+SEARCH_SQL = f"""
+    SELECT news.id, highlight({TABLE}, 0, %s, %s), news.date,
+           snippet({TABLE}, 1, %s, %s, '…', %s), page.rank
+    FROM (
+        SELECT id, rank FROM (
+            SELECT rowid AS id, rank FROM {TABLE}
+            WHERE {TABLE} MATCH %s
+            ORDER BY rowid DESC
+            LIMIT %s
+        )
+        {{after}}
+        ORDER BY rank, id
+        LIMIT %s
+    ) AS page
+    JOIN {TABLE} ON {TABLE}.rowid = page.id
+    JOIN news_news AS news ON news.id = page.id
+    WHERE {TABLE} MATCH %s
+    ORDER BY page.rank, page.id
+"""
+AFTER_SQL = 'WHERE rank > %s OR (rank = %s AND id > %s)'
+# Есть ли совпадение старше SEARCH_CANDIDATES новых; ранг не считается.
+CAPPED_SQL = f"""
+    SELECT 1 FROM {TABLE} WHERE {TABLE} MATCH %s
+    ORDER BY rowid DESC
+    LIMIT 1 OFFSET %s
+"""
+
+
+def make_match(query):
+    """
+    Запрос пользователя в выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы операторы и скобки FTS5 из
+    ввода не ломали запрос; все слова должны найтись.
+    """
+    return ' '.join(f'"{word}"' for word in WORD.findall(query))
+
+
+def mark(text):
+    """Экранируем текст и выделяем совпадения тегом mark."""
+    return mark_safe(
+        escape(text)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(result):
+    raw = json.dumps([result.rank, result.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, pk = json.loads(raw)
+        return float(rank), int(pk)
+    except (binascii.Error, TypeError, ValueError):
+        raise BadRequest('Некорректный курсор.')
+
+
+def search(query, per_page, cursor=None):
+    """Страница результатов поиска, начинающаяся после курсора."""
+    match = make_match(query)
+    if not match:
+        return SearchPage([], None, False)
+    params = [
+        MARK_START, MARK_END, MARK_START, MARK_END, SNIPPET_TOKENS,
+        match, settings.SEARCH_CANDIDATES,
+    ]
+    after = ''
+    if cursor:
+        rank, pk = decode_cursor(cursor)
+        after = AFTER_SQL
+        params += [rank, rank, pk]
+    params += [per_page + 1, match]
+    connection = connections[router.db_for_read(News)]
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(SEARCH_SQL.format(after=after), params)
+        rows = db_cursor.fetchall()
+        db_cursor.execute(CAPPED_SQL, [match, settings.SEARCH_CANDIDATES])
+        capped = db_cursor.fetchone() is not None
+    date_field = News._meta.get_field('date')
+    results = [
+        SearchResult(
+            pk,
+            mark(title),
+            date_field.to_python(date),
+            mark(snippet),
+            rank,
+        )
+        for pk, title, date, snippet, rank in rows[:per_page]
+    ]
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(results[-1])
+    return SearchPage(results, next_cursor, capped)
+
+
+def rebuild_index():
+    """Создаём недостающие триггеры и перестраиваем индекс."""
+    with connections[router.db_for_write(News)].cursor() as cursor:
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
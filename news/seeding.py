@@ -0,0 +1,117 @@
+"""Генерация большого объёма тестовых данных."""
+
+import itertools
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache as page_cache
+from .models import Comment, News, make_excerpt
+
+WORDS = (
+    'новость', 'город', 'жители', 'сегодня', 'учёные', 'проект', 'школа',
+    'погода', 'выставка', 'команда', 'матч', 'победа', 'история', 'театр',
+    'дорога', 'мост', 'парк', 'концерт', 'рынок', 'технологии', 'робот',
+    'сообщили', 'рассказали', 'открыли', 'решили', 'показали', 'нашли',
+)
+
+
+def make_text(rng, words_count):
+    return ' '.join(rng.choices(WORDS, k=words_count)).capitalize() + '.'
+
+
+def comments_per_news(rng, news_count, comments_count, skew):
+    """
+    Раскладываем комментарии по новостям по закону Ципфа.
+
+    Новость с рангом r получает долю, пропорциональную 1 / r ** skew:
+    несколько горячих тем собирают большую часть обсуждений.
+    """
+    weights = list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, news_count + 1)
+    ))
+    counts = [0] * news_count
+    for index in rng.choices(
+        range(news_count), cum_weights=weights, k=comments_count
+    ):
+        counts[index] += 1
+    return counts
+
+
+def bulk_create(model, objs, batch_size):
+    """bulk_create по частям, не собирая все объекты в памяти."""
+    objs = iter(objs)
+    while True:
+        batch = list(itertools.islice(objs, batch_size))
+        if not batch:
+            break
+        model.objects.bulk_create(batch)
+
+
+def seed(
+        news_count, users_count, comments_count, skew=1.1, batch_size=1000,
+        random_seed=None
+):
+    """Создаём новости, пользователей и комментарии через bulk_create."""
+    rng = random.Random(random_seed)
+    User = get_user_model()
+    prefix = uuid.uuid4().hex[:8]
+    password = make_password(None)
+    today = timezone.now()
+    counts = comments_per_news(rng, news_count, comments_count, skew)
+    with transaction.atomic():
+        bulk_create(
+            User,
+            (
+                User(username=f'seed_{prefix}_{index}', password=password)
+                for index in range(users_count)
+            ),
+            batch_size,
+        )
+        user_ids = list(User.objects.filter(
+            username__startswith=f'seed_{prefix}_'
+        ).values_list('id', flat=True))
+        # SQLite не возвращает id из bulk_create, поэтому берём новые
+        # записи по id: транзакция держит блокировку записи.
+        last_id = News.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+        bulk_create(
+            News,
+            (
+                News(
+                    title=make_text(rng, 4)[:50],
+                    text=text,
+                    excerpt=make_excerpt(text),
+                    date=today - timedelta(days=index),
+                    comment_count=count,
+                )
+                for index, count in enumerate(counts)
+                for text in (make_text(rng, rng.randint(20, 80)),)
+            ),
+            batch_size,
+        )
+        news_ids = list(News.objects.filter(pk__gt=last_id).order_by(
+            'id'
+        ).values_list('id', flat=True))
+        bulk_create(
+            Comment,
+            (
+                Comment(
+                    news_id=news_id,
+                    author_id=rng.choice(user_ids),
+                    text=make_text(rng, rng.randint(3, 30)),
+                )
+                for news_id, count in zip(news_ids, counts)
+                for _ in range(count)
+            ),
+            batch_size,
+        )
+    # bulk_create не отправляет сигналы, поэтому сбрасываем кеш сами.
+    page_cache.invalidate(page_cache.home_page_key())
+    return news_ids, user_ids
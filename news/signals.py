@@ -0,0 +1,159 @@
+"""Поддержка денормализованных данных новостей в актуальном состоянии."""
+
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache as page_cache
+from .events import comment_events
+from .models import Comment, News, make_excerpt
+
+
+def touch_news(news_id, delta=0):
+    """
+    Атомарно изменяем счётчик комментариев новости на delta.
+
+    Заодно обновляем время изменения новости: по нему строятся
+    валидаторы для условных запросов.
+    """
+    News.objects.filter(pk=news_id).update(
+        comment_count=F('comment_count') + delta,
+        modified=timezone.now(),
+    )
+
+
+def comment_page_keys(news_id):
+    """
+    Комментарии новости, её страница и главная.
+
+    На главной выводится число комментариев, поэтому она тоже меняется.
+    """
+    return (
+        page_cache.home_page_key(),
+        page_cache.detail_page_key(news_id),
+        page_cache.comments_key(news_id),
+    )
+
+
+def comments_created(counts):
+    """
+    То же, что делают сигналы, для комментариев из bulk_create.
+
+    counts — число новых комментариев по id новостей.
+    """
+    keys = set()
+    for news_id, count in counts.items():
+        touch_news(news_id, count)
+        keys.update(comment_page_keys(news_id))
+    page_cache.invalidate(*keys)
+    transaction.on_commit(lambda: comment_events.publish(list(counts)))
+
+
+@receiver(pre_save, sender=News)
+def fill_news_fields(sender, instance, raw=False, **kwargs):
+    """Обновляем выдержку, в том числе при загрузке фикстур."""
+    instance.excerpt = make_excerpt(instance.text)
+    if raw and instance.modified is None:
+        # При загрузке фикстур auto_now не срабатывает.
+        instance.modified = timezone.now()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    """Увеличиваем счётчик и будим подписчиков при создании комментария."""
+    if raw:
+        return
+    touch_news(instance.news_id, 1 if created else 0)
+    if created:
+        transaction.on_commit(
+            lambda: comment_events.publish([instance.news_id])
+        )
+
+
+class DeletedComments(threading.local):
+    """
+    Новости, у которых удаление в текущем потоке забирает комментарии.
+
+    Collector сначала шлёт pre_delete для всех удаляемых объектов, затем
+    удаляет комментарии одним запросом и только потом шлёт их post_delete.
+    Поэтому новости собираются в pre_delete, а на первом post_delete их
+    счётчики пересчитываются одним UPDATE: сколько бы комментариев ни
+    удалялось, каскадом или через QuerySet.delete(). Новости, которые
+    удаляются вместе с комментариями, не обновляются и не сбрасываются
+    здесь — их страницы сбрасывает news_changed.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.news_ids = set()
+        self.deleted_news_ids = set()
+        self.done = False
+
+    def start(self):
+        # Следующее удаление начинается с нового набора.
+        if self.done:
+            self.reset()
+
+    def flush(self, using):
+        if self.done:
+            return
+        news_ids = self.news_ids - self.deleted_news_ids
+        if news_ids:
+            # Пересчёт, а не вычитание: счётчик не уйдёт ниже нуля, даже
+            # если разошёлся с таблицей.
+            News.objects.using(using).filter(
+                pk__in=news_ids
+            ).recount_comments()
+            page_cache.invalidate(*{
+                key for news_id in news_ids
+                for key in comment_page_keys(news_id)
+            })
+        self.done = True
+
+
+deleted_comments = DeletedComments()
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_deleting(sender, instance, **kwargs):
+    deleted_comments.start()
+    deleted_comments.news_ids.add(instance.news_id)
+
+
+@receiver(pre_delete, sender=News)
+def news_deleting(sender, instance, **kwargs):
+    deleted_comments.start()
+    deleted_comments.deleted_news_ids.add(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, using, **kwargs):
+    """
+    Пересчитываем счётчики после удаления комментариев.
+
+    Сигнал приходит и при каскадном удалении, и при удалении через
+    QuerySet.delete(), поэтому счётчик не расходится с таблицей.
+    """
+    deleted_comments.flush(using)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def news_changed(sender, instance, **kwargs):
+    """Сбрасываем страницу новости и главную."""
+    page_cache.invalidate(
+        page_cache.home_page_key(), page_cache.detail_page_key(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Сбрасываем комментарии новости, её страницу и главную."""
+    page_cache.invalidate(*comment_page_keys(instance.news_id))
@@ -0,0 +1,39 @@
+"""
+Тесты через unittest.
+
+Модули берут отсюда setUpModule и tearDownModule: кеш страниц и канал
+сбросов у них в своём каталоге. Общий кеш машины тесты не трогают — в
+нём страницы работающего сайта.
+"""
+
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+
+private_caches = []
+
+
+def setUpModule():
+    directory = tempfile.TemporaryDirectory()
+    path = Path(directory.name)
+    private_cache = override_settings(
+        CACHE_DIR=path,
+        CACHES={
+            **settings.CACHES,
+            'default': {
+                **settings.CACHES['default'],
+                'LOCATION': path / 'yanews-cache',
+            },
+        },
+        PAGE_CACHE_CHANNEL=path / 'yanews-page-cache.log',
+    )
+    private_cache.enable()
+    private_caches.append((private_cache, directory))
+
+
+def tearDownModule():
+    private_cache, directory = private_caches.pop()
+    private_cache.disable()
+    directory.cleanup()
@@ -6,7 +6,9 @@ from django.urls import reverse
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from news import cache as page_cache
 from news.models import Comment, News
+from news.tests import setUpModule, tearDownModule  # noqa: F401
 from news.forms import CommentForm
 
 User = get_user_model()
@@ -31,6 +33,10 @@ class TestContent(TestCase):
             all_news.append(news)
         News.objects.bulk_create(all_news)
 
+    def setUp(self):
+        """Страницы не должны приходить из кеша прошлых тестов."""
+        page_cache.clear()
+
     def test_news_count(self):
         """Проверяем, что на домашней странице 10 новостей."""
         response = self.client.get(self.HOME_URL)
@@ -66,6 +72,10 @@ class TestDetailPage(TestCase):
             comment.created = now + timedelta(days=index)
             comment.save()
 
+    def setUp(self):
+        """Страницы не должны приходить из кеша прошлых тестов."""
+        page_cache.clear()
+
     def test_comments_order(self):
         """Проверяем сортировку комментариев по времени убывания."""
         response = self.client.get(self.detail_url)
@@ -7,6 +7,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 from news.forms import BAD_WORDS, WARNING
 from news.models import Comment, News
+from news.tests import setUpModule, tearDownModule  # noqa: F401
 
 User = get_user_model()
 
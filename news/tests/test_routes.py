@@ -5,6 +5,7 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
 from news.models import Comment, News
+from news.tests import setUpModule, tearDownModule  # noqa: F401
 
 User = get_user_model()
 
@@ -28,7 +29,10 @@ class TestRoutes(TestCase):
         """Данные адреса всем доступны."""
         urls = (
             ('news:home', None),
+            ('news:archive', None),
+            ('news:search', None),
             ('news:detail', (self.news.id,)),
+            ('news:events', (self.news.id,)),
             ('users:login', None),
             ('users:logout', None),
             ('users:signup', None),
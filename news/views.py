@@ -1,46 +1,405 @@
+from collections import namedtuple
+from contextlib import nullcontext
+from http import HTTPStatus
+
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import BadRequest, ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.http import (HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404
+from django.template.loader import get_template, render_to_string
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views import generic
 
+from yanews.replicas import read_from_primary, use_primary
+
+from . import cache as page_cache
+from . import events
+from .counters import get_popular_ids, view_counter
+from .export import MODELS, export_lines, parse_since
 from .forms import CommentForm
 from .models import Comment, News
+from .pagination import KeysetPaginator
+from .search import search
+from .write_behind import CommentQueueFull, comment_writer
+
+
+RenderedComment = namedtuple('RenderedComment', ('pk', 'author_id', 'html'))
+# Место комментариев в странице, которая отдаётся потоком.
+STREAM_MARKER = mark_safe('<!-- comments -->')
+
+
+def comments_url(news_id):
+    """Адрес блока комментариев на странице новости."""
+    return reverse('news:detail', kwargs={'pk': news_id}) + '#comments'
+
+
+def get_comments_page(news_id, cursor=None):
+    """
+    Страница комментариев к новости, начиная с курсора.
+
+    Комментарии отрисованы заранее и одинаковы для всех читателей, поэтому
+    страница хранится в кеше под версией комментариев новости. Ссылки на
+    редактирование своих комментариев шаблон добавляет поверх,
+    по author_id.
+    """
+    key = page_cache.comments_key(news_id)
+    version = page_cache.get_version(key)
+    variant = f'{settings.COMMENTS_COUNT_ON_PAGE}:{cursor or ""}'
+    page = page_cache.get_page(key, version, variant)
+    if page is not None:
+        return page
+    paginator = KeysetPaginator(
+        ('created', 'id'), settings.COMMENTS_COUNT_ON_PAGE
+    )
+    with read_from_primary():
+        page = paginator.paginate(
+            Comment.objects.filter(news_id=news_id).select_related('author'),
+            cursor,
+        )
+    template = get_template('includes/comment.html')
+    page = page._replace(object_list=[
+        RenderedComment(
+            comment.pk,
+            comment.author_id,
+            template.render({'comment': comment}),
+        )
+        for comment in page.object_list
+    ])
+    page_cache.set_page(key, version, page, variant)
+    return page
+
+
+def page_response(request, page):
+    """Ответ из страницы кеша: 304, если ETag клиента актуален."""
+    content, headers = page
+    response = HttpResponse(content, headers=headers)
+    return get_conditional_response(
+        request, etag=response.get('ETag'), response=response
+    )
+
+
+class AnonymousPageCacheMixin:
+    """
+    Отдаём анонимным читателям готовую страницу из кеша.
+
+    Страницы сбрасываются сигналами при изменении новостей и комментариев,
+    поэтому попадание в кеш не делает ни одного запроса к базе. Вместе
+    со страницей хранятся её заголовки, и актуальный ETag из кеша тоже
+    получает 304. Страница для кеша строится по основной базе: реплика
+    может ещё не получить изменение, которое сбросило кеш.
+    """
+    cached_headers = ('Content-Type', 'ETag', 'Cache-Control')
+
+    def get_page_cache_key(self):
+        raise NotImplementedError
+
+    def is_page_cacheable(self):
+        if self.request.GET:
+            return False
+        if settings.SESSION_COOKIE_NAME not in self.request.COOKIES:
+            return True
+        return not self.request.user.is_authenticated
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_page_cacheable():
+            return super().get(request, *args, **kwargs)
+        key = self.get_page_cache_key()
+        version = page_cache.get_version(key)
+        page = page_cache.get_page(key, version)
+        if page is not None:
+            return page_response(request, page)
+        with read_from_primary():
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != HTTPStatus.OK:
+                return response
+            # Страница отрисовывается здесь, до обработчика шаблонов
+            # MetricsMiddleware, поэтому засекаем шаблон сами.
+            timings = getattr(request, 'timings', None)
+            if timings:
+                timings.track_template(response)
+            response.render()
+        if not response.cookies:
+            headers = {
+                name: response[name]
+                for name in self.cached_headers if response.has_header(name)
+            }
+            page_cache.set_page(key, version, (response.content, headers))
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Отвечаем 304, пока страница у клиента не устарела.
+
+    ETag строится по тем же строкам, которые затем выводит страница,
+    поэтому проверка обходится одним запросом и делается до отрисовки
+    шаблона и чтения комментариев. Для вошедшего пользователя в ETag
+    входят его id и CSRF-секрет: от них зависят шапка и форма.
+    """
+
+    def get_etag_parts(self):
+        raise NotImplementedError
+
+    def get_etag(self):
+        parts = self.get_etag_parts()
+        user = self.request.user
+        if user.is_authenticated:
+            # Секрет создаётся заранее, чтобы первый ответ и следующий
+            # запрос с тем же cookie давали одинаковый ETag.
+            get_token(self.request)
+            parts = (parts, user.pk, self.request.META['CSRF_COOKIE'])
+        return page_cache.make_etag(parts)
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        response = get_conditional_response(
+            request, etag=etag
+        ) or super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        # Браузер и CDN хранят страницу, но каждый раз сверяют ETag.
+        patch_cache_control(
+            response,
+            no_cache=True,
+            private=request.user.is_authenticated,
+        )
+        return response
 
 
-class NewsList(generic.ListView):
+class NewsList(
+        AnonymousPageCacheMixin, ConditionalGetMixin, generic.ListView
+):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
 
+    def get_page_cache_key(self):
+        return page_cache.home_page_key()
+
+    def get_etag_parts(self):
+        return (
+            [(news.pk, news.modified) for news in self.get_queryset()],
+            self.get_popular_ids(),
+        )
+
+    def get_popular_ids(self):
+        if not hasattr(self, 'popular_ids'):
+            self.popular_ids = get_popular_ids()
+        return self.popular_ids
+
     def get_queryset(self):
         """
-        Выводим только несколько последних новостей.
+        Выводим только несколько последних или популярных новостей.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта. Выборка общая
+        на весь запрос: строки, прочитанные для ETag, выводятся повторно
+        без запроса к базе.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        if not hasattr(self, 'news_list'):
+            # Полный текст на главной не нужен, выводится выдержка.
+            queryset = self.model.objects.defer('text')
+            if self.request.GET.get('order') == 'popular':
+                ids = self.get_popular_ids()
+                news = queryset.in_bulk(ids)
+                self.news_list = [news[pk] for pk in ids if pk in news]
+            else:
+                self.news_list = queryset[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.news_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['popular'] = self.model.objects.filter(
+            pk__in=self.get_popular_ids()
+        ).order_by('-views', '-id').only('pk', 'title')
+        context['order'] = self.request.GET.get('order')
+        return context
+
+
+class NewsArchive(generic.ListView):
+    """Архив всех новостей с постраничным выводом по курсору."""
+    model = News
+    template_name = 'news/archive.html'
+
+    def get_queryset(self):
+        paginator = KeysetPaginator(
+            ('-date', '-id'), settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+        )
+        self.page = paginator.paginate(
+            self.model.objects.defer('text'), self.request.GET.get('cursor')
+        )
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.page.next_cursor
+        return context
+
+
+class NewsSearch(generic.ListView):
+    """Полнотекстовый поиск по новостям с постраничным выводом по курсору."""
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        self.page = search(
+            self.query,
+            settings.NEWS_COUNT_ON_SEARCH_PAGE,
+            self.request.GET.get('cursor'),
+        )
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['next_cursor'] = self.page.next_cursor
+        context['capped'] = self.page.capped
+        context['search_candidates'] = settings.SEARCH_CANDIDATES
+        return context
 
 
-class NewsDetail(generic.DetailView):
+class NewsDetail(
+        AnonymousPageCacheMixin, ConditionalGetMixin, generic.DetailView
+):
     model = News
     template_name = 'news/detail.html'
+    # Асинхронное представление передаёт уже прочитанную новость.
+    news = None
+
+    def get_page_cache_key(self):
+        return page_cache.detail_page_key(self.kwargs['pk'])
+
+    def get(self, request, *args, **kwargs):
+        """Просмотр засчитывается и для ответа из кеша, и для 304."""
+        response = super().get(request, *args, **kwargs)
+        view_counter.hit(self.kwargs['pk'])
+        return response
+
+    def get_etag_parts(self):
+        news = self.get_object()
+        return news.pk, news.modified, news.comment_count
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        """Новость читаем один раз: по ней же строится ETag."""
+        if self.news is None:
+            self.news = get_object_or_404(self.model, pk=self.kwargs['pk'])
+        return self.news
 
     def get_context_data(self, **kwargs):
+        """
+        Выводим первую страницу комментариев или, с ?comments=all, все.
+
+        Все комментарии не собираются в памяти: на их месте в странице
+        остаётся метка, а сами они отдаются потоком. Новые комментарии
+        страница получает через события после events_after.
+        """
         context = super().get_context_data(**kwargs)
+        if self.request.GET.get('comments') == 'all':
+            self.last_comment_id = Comment.objects.filter(
+                news_id=self.object.pk
+            ).aggregate(last_id=Max('pk'))['last_id'] or 0
+            if self.last_comment_id:
+                context['stream_marker'] = STREAM_MARKER
+            context['events_after'] = self.last_comment_id
+        else:
+            comments = get_comments_page(self.object.pk)
+            context['comments'] = comments
+            if not comments.next_cursor:
+                context['events_after'] = (
+                    comments.object_list[-1].pk if comments.object_list else 0
+                )
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        if 'stream_marker' not in context:
+            return super().render_to_response(context, **response_kwargs)
+        head, tail = render_to_string(
+            self.get_template_names(), context, self.request
+        ).split(STREAM_MARKER)
+        # Ветку читают уже после StickyPrimaryMiddleware: запоминаем,
+        # откуда прочитан last_comment_id, пока запрос ещё «прилип».
+        self.sticky = use_primary.get()
+        return StreamingHttpResponse(self.stream_comments(head, tail))
+
+    def stream_comments(self, head, tail):
+        """
+        Шапка и новость сразу, затем комментарии пачками.
+
+        Комментарии читаются курсором через iterator(), поэтому ни время
+        до первого байта, ни память не зависят от длины ветки.
+        Комментарии после last_comment_id придут через события. Ветка
+        читается из той же базы, что и last_comment_id: иначе автор не
+        увидел бы свой комментарий, которого ещё нет на реплике.
+        """
+        yield head
+        comment_template = get_template('includes/comment.html')
+        list_template = get_template('includes/comment_list.html')
+        chunk_size = settings.COMMENTS_STREAM_CHUNK_SIZE
+        with read_from_primary() if self.sticky else nullcontext():
+            comments = Comment.objects.filter(
+                news_id=self.object.pk, pk__lte=self.last_comment_id
+            ).select_related('author').iterator(chunk_size=chunk_size)
+            chunk = []
+            for comment in comments:
+                chunk.append(RenderedComment(
+                    comment.pk,
+                    comment.author_id,
+                    comment_template.render({'comment': comment}),
+                ))
+                if len(chunk) == chunk_size:
+                    yield self.render_chunk(list_template, chunk)
+                    chunk = []
+        yield self.render_chunk(list_template, chunk) + tail
+
+    def render_chunk(self, template, comments):
+        return template.render(
+            {'object_list': comments, 'user': self.request.user}
+        )
+
+
+class NewsComments(generic.TemplateView):
+    """Фрагмент со следующей страницей комментариев к новости."""
+    template_name = 'includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['news_id'] = self.kwargs['pk']
+        context['comments'] = get_comments_page(
+            self.kwargs['pk'], self.request.GET.get('cursor')
+        )
+        return context
+
+
+class NewsEvents(generic.View):
+    """
+    Новые комментарии к новости в формате server-sent events.
+
+    Под WSGI поток не держится открытым: ответ содержит комментарии,
+    накопившиеся после Last-Event-ID, и браузер переподключается.
+    Под ASGI этот адрес обслуживает async_views.news_events.
+    """
+
+    def get(self, request, *args, **kwargs):
+        position = events.parse_position(
+            request.headers.get('Last-Event-ID') or request.GET.get('after')
+        )
+        position = events.start_position(self.kwargs['pk'], position)
+        batch = events.comments_after(self.kwargs['pk'], position)
+        response = HttpResponse(
+            events.preamble(position) + batch.data,
+            content_type=events.CONTENT_TYPE,
+        )
+        patch_cache_control(response, no_cache=True)
+        return response
+
 
 class NewsComment(
         LoginRequiredMixin,
@@ -52,19 +411,41 @@ class NewsComment(
     template_name = 'news/detail.html'
 
     def post(self, request, *args, **kwargs):
+        """Новость читаем один раз за запрос."""
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = get_comments_page(self.object.pk)
+        return context
+
     def form_valid(self, form):
+        """
+        Сохраняем комментарий сразу или через очередь отложенной записи.
+
+        В режиме очереди запрос не держит свою транзакцию: иначе поток
+        записи ждал бы блокировку, которую держит ожидающий его запрос.
+        """
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_WRITE_BEHIND:
+            try:
+                comment_writer.submit(comment)
+            except CommentQueueFull:
+                return HttpResponse(
+                    'Слишком много комментариев, попробуйте позже.',
+                    status=HTTPStatus.SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '1'},
+                )
+        else:
+            with transaction.atomic():
+                comment.save()
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return comments_url(self.object.pk)
 
 
 class NewsDetailView(generic.View):
@@ -79,18 +460,28 @@ class NewsDetailView(generic.View):
 
 
 class CommentBase(LoginRequiredMixin):
-    """Базовый класс для работы с комментариями."""
+    """
+    Базовый класс для работы с комментариями.
+
+    Комментарий читается один раз за запрос, а адрес возврата строится
+    по news_id без чтения самой новости.
+    """
     model = Comment
 
+    @method_decorator(transaction.atomic)
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
     def get_success_url(self):
-        comment = self.get_object()
-        return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
-        ) + '#comments'
+        return comments_url(self.object.news_id)
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        queryset = self.model.objects.filter(author=self.request.user)
+        if self.request.method == 'GET':
+            # Шаблоны подтверждения выводят заголовок новости.
+            queryset = queryset.select_related('news')
+        return queryset
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,7 +489,41 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=('text',))
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    @method_decorator(transaction.atomic)
+    def delete(self, request, *args, **kwargs):
+        return super().delete(request, *args, **kwargs)
+
+
+class NewsExport(UserPassesTestMixin, generic.View):
+    """Потоковая выгрузка новостей и комментариев в NDJSON для сотрудников."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        params = request.GET
+        try:
+            since = params.get('since') and parse_since(params['since'])
+            news_since_id = int(params.get('news_since_id', 0))
+            comments_since_id = int(params.get('comments_since_id', 0))
+        except (ValidationError, ValueError):
+            raise BadRequest('Некорректные параметры выгрузки.')
+        lines = export_lines(
+            models=params.getlist('models') or MODELS,
+            since=since or None,
+            news_since_id=news_since_id,
+            comments_since_id=comments_since_id,
+        )
+        return StreamingHttpResponse(
+            lines, content_type='application/x-ndjson; charset=utf-8'
+        )
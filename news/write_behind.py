@@ -0,0 +1,142 @@
+"""
+Отложенная запись комментариев.
+
+При COMMENT_WRITE_BEHIND = True проверенные комментарии попадают в
+ограниченную очередь, а отдельный поток записывает их пачками: одна
+транзакция с bulk_create на пачку вместо транзакции на каждый
+комментарий. Запрос ждёт, пока транзакция с его комментарием
+зафиксируется, поэтому после редиректа автор видит свой комментарий.
+Пока идёт запись, в очереди копится следующая пачка. Счётчики и кеш
+обновляются теми же функциями, что и сигналы. При заполненной очереди
+submit() сразу отказывает, при выходе из процесса очередь дописывается.
+"""
+
+import atexit
+import queue
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from .models import Comment
+from .signals import comments_created
+
+STOP = object()
+
+
+class CommentQueueFull(Exception):
+    """Очередь заполнена, комментарий не принят."""
+
+
+class QueuedComment:
+    """Комментарий в очереди и результат его записи."""
+
+    def __init__(self, comment):
+        self.comment = comment
+        self.done = threading.Event()
+        self.error = None
+
+
+class CommentWriter:
+    """Очередь комментариев и поток, который пишет их пачками."""
+
+    def __init__(self):
+        self.queue = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            # Очередь переживает перезапуск потока вместе с комментариями.
+            if self.queue is None:
+                self.queue = queue.Queue(settings.COMMENT_QUEUE_SIZE)
+            self.thread = threading.Thread(
+                target=self.run, name='comment-writer', daemon=True
+            )
+            self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Дописываем очередь и останавливаем поток."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.queue.put(STOP)
+        thread.join()
+        atexit.unregister(self.stop)
+
+    def submit(self, comment):
+        """
+        Ставим комментарий в очередь и ждём фиксации его пачки.
+
+        Если запись не уложилась в COMMENT_QUEUE_TIMEOUT, комментарий
+        остаётся в очереди и будет записан позже.
+        """
+        self.start()
+        item = QueuedComment(comment)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            raise CommentQueueFull
+        if item.done.wait(settings.COMMENT_QUEUE_TIMEOUT) and item.error:
+            raise item.error
+
+    def run(self):
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while batch[-1] is not STOP and (
+                    len(batch) < settings.COMMENT_BATCH_SIZE
+                ):
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is STOP
+                if stop:
+                    batch.pop()
+                if batch:
+                    self.write(batch)
+                if stop:
+                    return
+        finally:
+            connections.close_all()
+
+    def write(self, batch):
+        """
+        Пишем пачку одной транзакцией, при ошибке базы — по одному.
+
+        Любая ошибка достаётся запросам её комментариев, а не потоку:
+        иначе поток остановится, и запросы будут ждать до таймаута. Другие
+        ошибки могут случиться и после фиксации, поэтому пачка не
+        переписывается по одному, чтобы не задвоить комментарии.
+        """
+        try:
+            self.write_comments(batch)
+        except DatabaseError:
+            for item in batch:
+                try:
+                    self.write_comments([item])
+                except Exception as error:
+                    item.error = error
+        except Exception as error:
+            for item in batch:
+                item.error = error
+        finally:
+            for item in batch:
+                item.done.set()
+
+    def write_comments(self, batch):
+        comments = [item.comment for item in batch]
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+            comments_created(Counter(
+                comment.news_id for comment in comments
+            ))
+
+
+comment_writer = CommentWriter()
@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+os.environ.setdefault('YANEWS_ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+# Как get_asgi_application, но с обработчиком потоковых ответов.
+django.setup(set_prefix=False)
+
+# Импорт после настройки Django.
+from news.async_views import StreamingASGIHandler, with_events  # noqa: E402
+
+django_application = StreamingASGIHandler()
+
+application = with_events(django_application)
@@ -0,0 +1,18 @@
+"""
+Ключи общего кеша.
+
+Файловый кеш общий для всех процессов машины, в том числе для тестов и
+бенчмарков со своими базами. В ключ входит база, по данным которой
+построено значение, поэтому страницы тестовой базы не попадут на сайт,
+а страницы сайта — в тесты.
+"""
+
+import hashlib
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def make_key(key, key_prefix, version):
+    name = str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+    database = hashlib.sha1(name.encode()).hexdigest()[:12]
+    return f'{database}:{key_prefix}:{version}:{key}'
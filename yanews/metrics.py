@@ -0,0 +1,220 @@
+"""
+Замеры времени обработки запросов.
+
+Middleware считает для каждого запроса общее время, число и время
+SQL-запросов и время отрисовки шаблона, отдаёт их в заголовке
+Server-Timing и копит в гистограммах по имени представления.
+Гистограммы живут в памяти процесса и отдаются в текстовом формате
+Prometheus на /metrics.
+"""
+
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+METRICS = (
+    (
+        'yanews_request_duration_seconds',
+        'Время обработки запроса.',
+        DURATION_BUCKETS,
+    ),
+    (
+        'yanews_db_duration_seconds',
+        'Суммарное время SQL-запросов за запрос.',
+        DURATION_BUCKETS,
+    ),
+    (
+        'yanews_db_queries',
+        'Число SQL-запросов за запрос.',
+        QUERY_BUCKETS,
+    ),
+    (
+        'yanews_template_duration_seconds',
+        'Время отрисовки шаблона.',
+        DURATION_BUCKETS,
+    ),
+)
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами, как в Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Гистограммы всех метрик в разрезе представлений."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, values):
+        """Добавляем значения метрик одного запроса."""
+        with self._lock:
+            for (name, _, buckets), value in zip(METRICS, values):
+                if value is None:
+                    continue
+                histogram = self._histograms.get((name, view))
+                if histogram is None:
+                    histogram = Histogram(buckets)
+                    self._histograms[(name, view)] = histogram
+                histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus."""
+        lines = []
+        with self._lock:
+            for name, help_text, buckets in METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, view), histogram in sorted(
+                    self._histograms.items()
+                ):
+                    if metric != name:
+                        continue
+                    label = f'view="{view}"'
+                    total = 0
+                    for bound, count in zip(
+                        buckets + ('+Inf',), histogram.counts
+                    ):
+                        total += count
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {total}'
+                        )
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.db_time = 0
+        self.db_count = 0
+        self.template_start = None
+        self.template_time = None
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_count += 1
+
+    def track_queries(self):
+        """Засекаем SQL-запросы в соединениях текущего потока."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.execute))
+        return stack
+
+    def track_template(self, response):
+        """Засекаем отрисовку шаблона: она начинается после этого вызова."""
+        self.template_start = time.perf_counter()
+        response.add_post_render_callback(self.template_rendered)
+        return response
+
+    def template_rendered(self, response):
+        self.template_time = time.perf_counter() - self.template_start
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Собираем замеры запроса и отдаём их в Server-Timing.
+
+    Под ASGI запросы к базе идут в потоках исполнителя, а не в потоке
+    middleware: асинхронные представления засекают их сами через
+    request.timings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в MiddlewareMixin: Django не оборачивает middleware
+            # и его обработчик шаблонов в лишний поток.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_template_response = self.track_template_async
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        request.timings = timings
+        start = time.perf_counter()
+        with timings.track_queries():
+            response = self.get_response(request)
+        return self.finish(request, response, start)
+
+    async def __acall__(self, request):
+        request.timings = RequestTimings()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, start)
+
+    def finish(self, request, response, start):
+        timings = request.timings
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        registry.observe(view, (
+            total, timings.db_time, timings.db_count, timings.template_time,
+        ))
+        parts = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={timings.db_time * 1000:.1f};'
+            f'desc="{timings.db_count} queries"',
+        ]
+        if timings.template_time is not None:
+            parts.append(f'tpl;dur={timings.template_time * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(parts)
+        return response
+
+    async def track_template_async(self, request, response):
+        return self.process_template_response(request, response)
+
+    def process_template_response(self, request, response):
+        # Готовую страницу отрисовал и засёк тот, кто её отрисовал:
+        # асинхронное представление или кеш страниц.
+        if response.is_rendered:
+            return response
+        return request.timings.track_template(response)
+
+
+def metrics(request):
+    """Гистограммы процесса; доступны только с адресов INTERNAL_IPS."""
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
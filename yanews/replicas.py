@@ -0,0 +1,115 @@
+"""
+Чтение с реплик и запись в основную базу.
+
+Роутер отправляет запись в default, а чтение — на случайную реплику из
+settings.DATABASE_REPLICAS. Чтение тоже идёт в default внутри открытой
+транзакции и пока запрос «прилип» к основной базе. Middleware прилепляет
+к ней запросы с небезопасными методами. После такого запроса она ставит
+cookie, и следующие PRIMARY_STICKY_SECONDS секунд запросы этого клиента
+тоже читают из default: автор сразу видит свой комментарий, даже если
+реплика отстаёт. Страницы для общего кеша тоже строятся по основной
+базе (read_from_primary): иначе страница с отстающей реплики осталась
+бы в кеше до следующего изменения.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+use_primary = ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def read_from_primary():
+    """Внутри блока чтение идёт из основной базы."""
+    token = use_primary.set(True)
+    try:
+        yield
+    finally:
+        use_primary.reset(token)
+
+
+class ReplicaRouter:
+    """Запись в основную базу, чтение с реплик."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or use_primary.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема реплик приходит вместе с данными из основной базы.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class StickyPrimaryMiddleware:
+    """Читаем из основной базы при записи и сразу после неё."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def is_sticky(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        try:
+            until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            return False
+        return until > time.time()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = use_primary.set(self.is_sticky(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        return self.stick(request, response)
+
+    async def __acall__(self, request):
+        # Переменная контекста доходит и до потоков исполнителя:
+        # асинхронные представления запускают их в копии контекста.
+        token = use_primary.set(self.is_sticky(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        return self.stick(request, response)
+
+    def stick(self, request, response):
+        if request.method not in SAFE_METHODS:
+            seconds = settings.PRIMARY_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
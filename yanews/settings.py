@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -10,6 +12,8 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
+INTERNAL_IPS = ['127.0.0.1']
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -21,6 +25,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.metrics.MetricsMiddleware',
+    'yanews.replicas.StickyPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,11 +59,68 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # Встроенный SQLite с PRAGMA на каждом соединении.
+        'ENGINE': 'yanews.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, PRAGMA не повторяются.
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Читатели не ждут писателя, fsync только на контрольных
+                # точках журнала.
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+                # Страничный кеш 64 МБ на соединение и mmap до 256 МБ.
+                'cache_size': -64000,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'memory',
+            },
+        },
+    }
+}
+
+# Псевдонимы баз-реплик из DATABASES, например:
+# 'replica': {**DATABASES['default'], 'NAME': BASE_DIR / 'replica.sqlite3',
+#             'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['yanews.replicas.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает из основной базы.
+PRIMARY_STICKY_SECONDS = 5
+
+# Кеш должен быть общим для всех процессов сайта: в нём лежат версии
+# страниц. LocMemCache у каждого процесса свой, с ним приложение не
+# запускается. Между машинами нужен общий сервер кеша, например Memcached.
+# Каталог общего кеша и канала сбросов. Бенчмарки задают свой каталог
+# через окружение, чтобы не читать и не стирать кеш работающего сайта.
+CACHE_DIR = Path(os.environ.get('YANEWS_CACHE_DIR', tempfile.gettempdir()))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR / 'yanews-cache',
+        'KEY_FUNCTION': 'yanews.cache_keys.make_key',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Кеш страниц в памяти каждого процесса перед общим кешем. Асинхронные
+# представления отдают из него страницы, не сверяясь с каналом, если
+# процесс сверялся с ним не раньше SYNC_INTERVAL секунд назад.
+PAGE_CACHE_LOCAL = {
+    'MAX_ENTRIES': 1000,
+    'TIMEOUT': 60,
+    'SYNC_INTERVAL': 0.1,
+}
+
+# Файл, через который процессы сообщают друг другу о сброшенных страницах.
+PAGE_CACHE_CHANNEL = CACHE_DIR / 'yanews-page-cache.log'
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -81,9 +144,64 @@ LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
 
+NEWS_COUNT_ON_ARCHIVE_PAGE = 20
+
+NEWS_COUNT_ON_SEARCH_PAGE = 20
+
+# Сколько самых новых совпадений поиска ранжируется по bm25.
+SEARCH_CANDIDATES = 1000
+
+COMMENTS_COUNT_ON_PAGE = 50
+
+# По сколько комментариев отдаётся ветка целиком (?comments=all).
+COMMENTS_STREAM_CHUNK_SIZE = 200
+
+# Отложенная запись комментариев пачками из отдельного потока.
+COMMENT_WRITE_BEHIND = False
+
+COMMENT_QUEUE_SIZE = 1000
+
+COMMENT_BATCH_SIZE = 100
+
+# Сколько секунд запрос ждёт записи своего комментария.
+COMMENT_QUEUE_TIMEOUT = 5
+
+# Живые комментарии: сколько комментариев соединение читает за раз,
+# через сколько секунд молчания шлёт keepalive и заново проверяет базу,
+# через сколько миллисекунд браузер переподключается.
+COMMENT_EVENTS_BATCH_SIZE = 100
+
+COMMENT_EVENTS_KEEPALIVE = 15
+
+COMMENT_EVENTS_RETRY = 3000
+
+# Раз в сколько секунд просмотры новостей записываются в базу.
+VIEW_COUNTS_FLUSH_INTERVAL = 10
+
+# Рейтинг популярных новостей за последние POPULAR_NEWS_DAYS дней.
+POPULAR_NEWS_COUNT = 10
+
+POPULAR_NEWS_DAYS = 7
+
+# Под ASGI главная и страница новости обслуживаются асинхронными
+# представлениями; переменную окружения выставляет yanews/asgi.py.
+ASYNC_VIEWS = os.environ.get('YANEWS_ASYNC_VIEWS') == '1'
+
+# Потоки для работы асинхронных представлений с базой.
+ASYNC_DB_WORKERS = 8
+
+# Потоки, которые под ASGI отдают потоковые ответы, например всю ветку.
+ASYNC_STREAM_WORKERS = 4
+
+BAD_WORDS_FILE = BASE_DIR / 'news' / 'bad_words.txt'
+
 URL = {
     'detail': 'news:detail',
     'home': 'news:home',
+    'archive': 'news:archive',
+    'search': 'news:search',
     'delete': 'news:delete',
     'edit': 'news:edit',
+    'comments': 'news:comments',
+    'events': 'news:events',
 }
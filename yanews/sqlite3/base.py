@@ -0,0 +1,43 @@
+"""
+SQLite с настройками для работы под нагрузкой.
+
+Встроенный бэкенд Django, к которому добавлены два параметра OPTIONS:
+
+- pragmas — словарь PRAGMA, которые выполняются на каждом новом
+  соединении (journal_mode, synchronous, mmap_size и т.п.);
+- transaction_mode — режим BEGIN для transaction.atomic(). С IMMEDIATE
+  пишущая транзакция сразу берёт блокировку записи и ждёт её в пределах
+  busy_timeout, а не получает «database is locked», когда пытается
+  повысить блокировку чтения до записи.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Остальные OPTIONS передаются в sqlite3.connect() как есть.
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        if self.transaction_mode not in (None, *TRANSACTION_MODES):
+            raise ImproperlyConfigured(
+                f'Неизвестный transaction_mode: {self.transaction_mode}.'
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')